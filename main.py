@@ -1,27 +1,211 @@
+import argparse
 import os
-from src.extract_events import save_to_csv, get_event_data
-from src.find_contacts import load_companies, generate_contacts, save_contacts
-from src.infer_email import process_contacts as process_emails
-from src.generate_outreach import process_messages
+import subprocess
+import sys
+from src.extract_events import get_event_data
+from src.find_contacts import load_companies, generate_contacts, save_contacts, company_contacts, company_websites, iter_contacts, build_company_index, report_unmatched
+from src.followup_scheduler import add_scheduler_arguments, run_scheduler
+from src.ingest_events import add_ingest_arguments, ingest_command, iter_events, replace_builtin_events
+from src.infer_email import process_contacts as process_emails, ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP, KNOWN_EMAILS_PATH, iter_enriched_contacts
+from src.generate_outreach import process_messages, iter_messages
+from src.prompts import PROMPT_VERSION
+from src.lead_store import LeadStore, STORE_PATH, has_leads
+from src.llm import RateLimiter
+from src.manifest import MANIFEST_PATH, RowCheckpoint, StageManifest, fingerprint_file, fingerprint_value
+from src.metrics import get_metrics, set_job
+from src.sharding import add_merge_arguments, merge_command, parse_shard, shard_path, shard_rows
+from src.streaming import iter_csv, tee_to_csv, write_csv
+
+EVENTS_FILE = "data/events_companies.csv"
+CONTACTS_FILE = "data/contacts.csv"
+EMAILS_FILE = "data/contacts_with_emails.csv"
+MESSAGES_FILE = "data/contacts_with_messages.csv"
+
+STAGES = ["events", "contacts", "emails", "messages", "store"]
+COMMANDS = ["run", *STAGES, "stream", "ingest", "merge", "dashboard", "scheduler"]
+
+def parse_args(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    #"python main.py --concurrency 8" still means a full run
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv = ["run"] + argv
+
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of outreach messages to generate in parallel")
+    parser.add_argument("--rpm", type=int, default=None, help="OpenAI requests per minute limit")
+    parser.add_argument("--tpm", type=int, default=None, help="OpenAI tokens per minute limit")
+    parser.add_argument("--batch-size", type=int, default=1, help="Number of contacts to pack into each OpenAI request")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache entirely")
+    parser.add_argument("--refresh-cache", action="store_true", help="Regenerate every message and overwrite cached responses")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage even if its inputs haven't changed")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore and don't write per-row message checkpoints")
+    parser.add_argument("--store", default=STORE_PATH, help="SQLite lead store the dashboard reads from")
+    parser.add_argument("--stream", action="store_true", help="Chain the stages as generators so rows flow through without waiting for each stage to finish")
+    parser.add_argument("--show-tokens", action="store_true", help="Print each message as it streams in (only with --concurrency 1 and --batch-size 1)")
+    parser.add_argument("--write-intermediate", action="store_true", help="With --stream, also save the intermediate CSVs")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                        help="Only process shard i of N (split by company); combine the outputs with python main.py merge")
+
+    cli = argparse.ArgumentParser(description="Run the lead generation pipeline, or one stage of it")
+    commands = cli.add_subparsers(dest="command", metavar="command", required=True)
+    commands.add_parser("run", parents=[parser], help="Run every stage, skipping the ones whose inputs haven't changed (default)")
+    for stage in STAGES:
+        commands.add_parser(stage, parents=[parser], help=f"Run only the {stage} stage")
+    commands.add_parser("stream", parents=[parser], help="Same as run --stream")
+    add_ingest_arguments(commands.add_parser("ingest", help="Append exhibitor lists (CSV, JSONL, saved HTML) to the events file"))
+    add_merge_arguments(commands.add_parser("merge", help="Combine --shard outputs into one CSV (and store)"))
+    commands.add_parser("dashboard", help="Launch the Streamlit dashboard")
+    add_scheduler_arguments(commands.add_parser("scheduler", help="Keep drafting follow-ups ahead of their due date"))
+
+    args = cli.parse_args(argv)
+    if args.command == "run" and args.stream:
+        args.command = "stream"
+    return args
+
+def run_stage(manifest, name, fingerprint, outputs, run, force=False):
+    #Skips the stage when its inputs match the last successful run and its outputs are still on disk
+    if not force and manifest.is_fresh(name, fingerprint, outputs):
+        print(f"⏭️ Skipping {name}, inputs unchanged.")
+        get_metrics().increment("stages_skipped")
+        return
+    with get_metrics().stage(name):
+        run()
+    manifest.record(name, fingerprint)
+
+def run_streaming(args):
+    #Each stage pulls rows from the one before it, so memory stays flat and messages start landing right away
+    contacts_file, emails_file, messages_file = (shard_path(path, args.shard) for path in (CONTACTS_FILE, EMAILS_FILE, MESSAGES_FILE))
+    #the built in list joins whatever was ingested; the events file is only written with --write-intermediate
+    if args.write_intermediate:
+        replace_builtin_events(get_event_data(), EVENTS_FILE)
+        rows = iter_csv(EVENTS_FILE)
+    else:
+        rows = iter_events(get_event_data(), EVENTS_FILE)
+    company_index = build_company_index()
+    rows = iter_contacts(rows, company_index)
+    if args.shard is not None:
+        rows = shard_rows(rows, args.shard)
+    if args.write_intermediate:
+        rows = tee_to_csv(rows, contacts_file)
+    rows = iter_enriched_contacts(rows)
+    if args.write_intermediate:
+        rows = tee_to_csv(rows, emails_file)
+
+    rate_limiter = RateLimiter(args.rpm, args.tpm) if args.rpm or args.tpm else None
+    checkpoint = None if args.no_resume else RowCheckpoint(messages_file + ".checkpoint.jsonl")
+    rows = iter_messages(
+        rows,
+        concurrency=args.concurrency,
+        rate_limiter=rate_limiter,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh_cache,
+        batch_size=args.batch_size,
+        checkpoint=checkpoint,
+        show_tokens=args.show_tokens
+    )
+    if args.shard is not None:
+        #shards only produce their CSV; the merge step builds the store
+        count = write_csv(rows, messages_file)
+        report_unmatched(company_index)
+        print(f"\n✅ Streamed {count} contacts for shard {args.shard[0]}/{args.shard[1]}. Saved to: {messages_file}")
+        return
+    count = LeadStore(args.store).upsert_leads(tee_to_csv(rows, messages_file))
+    report_unmatched(company_index)
+    print(f"\n✅ Streamed {count} contacts through the pipeline. Final data saved to: {messages_file} and {args.store}")
+
+def report_metrics():
+    metrics = get_metrics()
+    report_path, prom_path = metrics.write()
+    totals = metrics.report()["totals"]
+    print(f"📈 {totals['calls']} OpenAI calls, {totals['prompt_tokens'] + totals['completion_tokens']} tokens, "
+          f"~${totals['estimated_cost_usd']:.2f}. Run report: {report_path} (Prometheus: {prom_path})")
 
 def main():
-    print("🔍 Extracting event/company data...")
-    events = get_event_data()
-    save_to_csv(events)
+    args = parse_args()
+    if args.command == "ingest":
+        try:
+            ingest_command(args.files, args.event, args.output)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        return
+    if args.command == "merge":
+        try:
+            merge_command(args.files, args.output, args.store, args.allow_partial)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        return
+    if args.command == "dashboard":
+        dashboard = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "dashboard.py")
+        sys.exit(subprocess.call([sys.executable, "-m", "streamlit", "run", dashboard]))
+    if args.command == "scheduler":
+        run_scheduler(args.store, args.activity_log, args.lead_days, args.poll_seconds, args.concurrency, args.once)
+        return
+
+    if args.shard is not None:
+        #shards can share a data directory, so each one keeps its own run report
+        set_job(f"pipeline-shard-{args.shard[0]}-of-{args.shard[1]}")
+    try:
+        if args.command == "stream":
+            with get_metrics().stage("stream"):
+                run_streaming(args)
+        else:
+            run_stages(args, STAGES if args.command == "run" else [args.command])
+    finally:
+        report_metrics()
+
+def run_stages(args, stages=STAGES):
+    #A shard keeps its own intermediate files and manifest, so shards can share a data directory
+    manifest = StageManifest(shard_path(MANIFEST_PATH, args.shard))
+    contacts_file, emails_file, messages_file = (shard_path(path, args.shard) for path in (CONTACTS_FILE, EMAILS_FILE, MESSAGES_FILE))
 
-    print("👤 Generating contacts...")
-    companies = load_companies()
-    contacts = generate_contacts(companies)
-    save_contacts(contacts)
+    if "events" in stages:
+        print("🔍 Extracting event/company data...")
+        events = get_event_data()
+        #Only the built-in rows are replaced, so companies brought in with python main.py ingest are kept
+        run_stage(manifest, "events", fingerprint_value(events), [EVENTS_FILE],
+                  lambda: print("Wrote {} built-in companies ({} ingested kept) -> {}".format(*replace_builtin_events(events, EVENTS_FILE), EVENTS_FILE)),
+                  args.force)
 
-    print("✉️ Inferring emails (or defaulting to LinkedIn)...")
-    process_emails()
+    if "contacts" in stages:
+        print("👤 Generating contacts...")
+        run_stage(manifest, "contacts", fingerprint_value([fingerprint_file(EVENTS_FILE), company_contacts, company_websites, args.shard]), [contacts_file],
+                  lambda: save_contacts(generate_contacts(load_companies(EVENTS_FILE), args.shard), contacts_file), args.force)
 
-    print("💬 Generating outreach messages...")
-    process_messages()
+    if "emails" in stages:
+        print("✉️ Inferring emails (or defaulting to LinkedIn)...")
+        run_stage(manifest, "emails", fingerprint_value([fingerprint_file(contacts_file), fingerprint_file(KNOWN_EMAILS_PATH), ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP]), [emails_file],
+                  lambda: process_emails(contacts_file, emails_file), args.force)
 
-    print("\n✅ Pipeline complete. Final data saved to: data/contacts_with_messages.csv")
+    if "messages" in stages:
+        print("💬 Generating outreach messages...")
+        #Row level checkpoints inside process_messages mean only new or changed contacts hit the API
+        run_stage(manifest, "messages", fingerprint_value([fingerprint_file(emails_file), PROMPT_VERSION]), [messages_file],
+                  lambda: process_messages(
+                      emails_file, messages_file,
+                      concurrency=args.concurrency,
+                      requests_per_minute=args.rpm,
+                      tokens_per_minute=args.tpm,
+                      use_cache=not args.no_cache,
+                      refresh_cache=args.refresh_cache,
+                      batch_size=args.batch_size,
+                      resume=not args.no_resume,
+                      show_tokens=args.show_tokens
+                  ), args.force or args.refresh_cache)
+
+    if "store" in stages:
+        if args.shard is not None:
+            #shards only produce their CSV; the merge step builds the store
+            print(f"\n✅ Shard {args.shard[0]}/{args.shard[1]} complete. Saved to: {messages_file}")
+            print("Once every shard is done: python main.py merge --store data/leads.sqlite")
+            return
+
+        print("🗄️ Loading leads into the dashboard store...")
+        #An empty or missing store is always reloaded, whatever the manifest says
+        run_stage(manifest, "store", fingerprint_value([fingerprint_file(MESSAGES_FILE), args.store]), [args.store],
+                  lambda: print(f"Loaded {LeadStore(args.store).import_csv(MESSAGES_FILE)} leads -> {args.store}"),
+                  args.force or not has_leads(args.store))
+
+        print(f"\n✅ Pipeline complete. Final data saved to: {MESSAGES_FILE} and {args.store}")
 
 if __name__ == "__main__":
     main()
-
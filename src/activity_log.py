@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+ACTIVITY_LOG_PATH = "data/activity_log.jsonl"
+
+EVENT_MESSAGES = {
+    "mark_sent": "Marked {name} ({title}, {company}) as contacted.",
+    "followup_generated": "Generated a follow-up for {name} ({title}, {company}).",
+    "snooze": "Snoozed {name} ({title}, {company}) until {next_followup_date}."
+}
+
+def format_event(entry):
+    template = EVENT_MESSAGES.get(entry.get("event"), "{event} for {name} ({title}, {company}).")
+    try:
+        return template.format(**entry)
+    except KeyError:
+        return json.dumps(entry)
+
+def backfill_from_leads(log, df):
+    #One-time seed for stores that predate the log: a mark_sent event per lead already contacted
+    contacted = df[df["last_outreach_date"].notna()]
+    log.append_many(
+        {
+            "ts": timestamp.isoformat(timespec="seconds"),
+            "event": "mark_sent",
+            "lead_id": int(lead_id),
+            "name": name,
+            "title": title,
+            "company": company
+        }
+        for lead_id, timestamp, name, title, company in zip(
+            contacted.index, contacted["last_outreach_date"], contacted["name"], contacted["title"], contacted["company"]
+        )
+    )
+
+class ActivityLog:
+    """
+    Append-only JSONL log of dashboard actions, one structured event per line.
+    Readers keep a byte offset and only ever parse the lines added since their last read.
+    """
+    def __init__(self, path=ACTIVITY_LOG_PATH):
+        self.path = path
+        self.entries = []
+        self.offset = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def append(self, event, lead_id=None, name="", title="", company="", timestamp=None, **details):
+        entry = {
+            "ts": (timestamp or datetime.now()).isoformat(timespec="seconds"),
+            "event": event,
+            "lead_id": lead_id,
+            "name": name,
+            "title": title,
+            "company": company,
+            **details
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+        return entry
+
+    def append_many(self, entries):
+        with self._lock:
+            with open(self.path, "a") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+
+    def read_since(self, offset):
+        """
+        Returns (new entries, new offset). A partially written last line is left for the next read.
+        """
+        if not os.path.exists(self.path):
+            return [], offset
+        entries = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries, offset
+
+    def refresh(self):
+        #Tails the file into the in-memory history
+        with self._lock:
+            new_entries, self.offset = self.read_since(self.offset)
+            self.entries.extend(new_entries)
+            return len(new_entries)
+
+    def page(self, page, page_size=20):
+        """
+        Newest first; page numbers start at 1.
+        """
+        self.refresh()
+        end = len(self.entries) - (page - 1) * page_size
+        start = max(0, end - page_size)
+        return list(reversed(self.entries[start:max(end, 0)]))
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+import pandas as pd
+
+ALL_COMPANIES = None
+
+def to_date(value):
+    if value is None or pd.isna(value):
+        return None
+    return pd.Timestamp(value).date()
+
+class LeadAggregates:
+    """
+    Per-company lead counts (total, sent, follow-ups due / not due), plus a roll-up across all companies.
+    Built once from the lead frame and then kept current in O(1) per changed lead.
+    Due counts depend on today's date, so they are re-derived from per-day follow-up counts when the day changes.
+    """
+    def __init__(self, df, today=None):
+        self.total = Counter(df["company"].value_counts().to_dict())
+        self.sent = Counter(df.loc[df["last_outreach_date"].notna(), "company"].value_counts().to_dict())
+
+        #company -> {follow-up date: number of leads}
+        self.followups = defaultdict(Counter)
+        scheduled = df[df["next_followup_date"].notna()]
+        grouped = scheduled.groupby([scheduled["company"], scheduled["next_followup_date"].dt.normalize()]).size()
+        for (company, day), count in grouped.items():
+            self.followups[company][to_date(day)] = int(count)
+
+        self._roll_up()
+        self._recount_due(today or datetime.now().date())
+
+    def _roll_up(self):
+        self.total[ALL_COMPANIES] = sum(count for company, count in self.total.items() if company is not ALL_COMPANIES)
+        self.sent[ALL_COMPANIES] = sum(count for company, count in self.sent.items() if company is not ALL_COMPANIES)
+
+    def _recount_due(self, today):
+        self.today = today
+        self.due = Counter()
+        self.not_due = Counter()
+        for company, days in self.followups.items():
+            for day, count in days.items():
+                bucket = self.due if day <= today else self.not_due
+                bucket[company] += count
+                bucket[ALL_COMPANIES] += count
+
+    def _adjust(self, counter, company, delta):
+        counter[company] += delta
+        counter[ALL_COMPANIES] += delta
+
+    def apply_update(self, company, old_last=None, new_last=None, old_next=None, new_next=None):
+        """
+        Adjusts the counts for one lead whose outreach and/or follow-up date changed.
+        """
+        if pd.isna(old_last) != pd.isna(new_last):
+            self._adjust(self.sent, company, 1 if pd.isna(old_last) else -1)
+
+        old_day, new_day = to_date(old_next), to_date(new_next)
+        if old_day == new_day:
+            return
+        if old_day is not None:
+            self.followups[company][old_day] -= 1
+            self._adjust(self.due if old_day <= self.today else self.not_due, company, -1)
+        if new_day is not None:
+            self.followups[company][new_day] += 1
+            self._adjust(self.due if new_day <= self.today else self.not_due, company, 1)
+
+    def counts(self, company=ALL_COMPANIES, today=None):
+        today = today or datetime.now().date()
+        if today != self.today:
+            self._recount_due(today)
+        return {
+            "total": self.total[company],
+            "sent": self.sent[company],
+            "not_sent": self.total[company] - self.sent[company],
+            "due": self.due[company],
+            "not_due": self.not_due[company]
+        }
@@ -0,0 +1,259 @@
+"""
+Scaling benchmarks for the pipeline and the dashboard's data paths, on synthetic data.
+Every pipeline stage runs against the local fake OpenAI server, so no API credits are spent:
+
+    python -m src.benchmark --sizes 1000 10000 100000 --latency 0.05 --error-rate 0.01
+    python -m src.benchmark --sizes 1000 --baseline data/benchmarks/<earlier run>.json
+
+Results are written as JSON to data/benchmarks/ (one file per run) so they can be compared over time.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+RESULTS_DIR = "data/benchmarks"
+DEFAULT_SIZES = [1000, 10000, 100000]
+CONTACTS_PER_COMPANY = 5
+COMPANIES_PER_EVENT = 50
+SEARCH_QUERIES = ["chief", "marketing", "vp sales", "graphics", "zzqx"]
+
+FIRST_NAMES = ["Anna", "Ben", "Carla", "David", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas", "Kemi", "Luis", "Maya", "Nikhil", "Olga", "Pedro"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Müller", "Okafor", "Rossi", "Kowalski", "Nguyen", "Johansson", "Patel", "Dubois", "Silva"]
+TITLES = ["Chief Marketing Officer", "VP of Sales", "Director of Product", "Head of Procurement", "Graphics Manager", "Business Development Lead"]
+INDUSTRY_WORDS = ["Graphics", "Signage", "Films", "Coatings", "Print", "Media", "Labels", "Displays"]
+SUFFIXES = ["Inc.", "LLC", "GmbH", "Corp", "", "Group"]
+EMAIL_FORMATS = ["first.last", "flast", "first", "first_last"]
+
+def make_dataset(contact_count, seed=0):
+    """
+    Returns (events rows, contact directory, company websites, known email rows) with about contact_count contacts.
+    Every third company is listed under a slightly different name in the directory so the resolver has work to do.
+    """
+    rnd = random.Random(seed)
+    company_count = max(1, contact_count // CONTACTS_PER_COMPANY)
+    events, directory, websites, known_emails = [], {}, {}, []
+
+    for i in range(company_count):
+        base = f"{rnd.choice(INDUSTRY_WORDS)}{i} {rnd.choice(INDUSTRY_WORDS)}"
+        #its own registered domain, or ingestion would dedupe every company into one
+        domain = f"company{i}.example"
+        event_name = f"{base} {rnd.choice(SUFFIXES)}".strip()
+        directory_name = base if i % 3 else f"{base} International"
+        events.append({
+            "event": f"Expo {i // COMPANIES_PER_EVENT}",
+            "company": event_name,
+            "website": f"https://www.{domain}",
+            "rationale": f"{base} makes large format {rnd.choice(INDUSTRY_WORDS).lower()}."
+        })
+        websites[directory_name] = f"https://{domain}"
+
+        contacts = []
+        email_format = EMAIL_FORMATS[i % len(EMAIL_FORMATS)]
+        for j in range(CONTACTS_PER_COMPANY):
+            first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            contacts.append({
+                "name": f"{first} {last}",
+                "title": rnd.choice(TITLES),
+                "linkedin_url": f"https://www.linkedin.com/in/{first.lower()}-{last.lower()}-{i}-{j}/"
+            })
+        directory[directory_name] = contacts
+
+        #half the companies come with two known addresses, enough for the email stage to learn their format
+        if i % 2 == 0:
+            for contact in contacts[:2]:
+                first, last = contact["name"].lower().split()
+                local = {"first.last": f"{first}.{last}", "flast": f"{first[0]}{last}",
+                         "first": first, "first_last": f"{first}_{last}"}[email_format]
+                known_emails.append({"name": contact["name"], "email": f"{local}@{domain}"})
+
+    return events, directory, websites, known_emails
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class Recorder:
+    def __init__(self, size, quiet=True):
+        self.size = size
+        self.quiet = quiet
+        self.results = []
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        #The pipeline prints a line per contact; that output is muted so the terminal isn't what gets measured
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if self.quiet else sys.stdout):
+            yield
+        seconds = time.perf_counter() - start
+        result = {"size": self.size, "stage": name, "seconds": round(seconds, 4), "rows": rows}
+        if rows:
+            result["rows_per_second"] = round(rows / seconds, 1) if seconds else None
+        result["max_rss_mb"] = max_rss_mb()
+        self.results.append(result)
+        print(f"  {name:<24} {seconds:9.3f}s" + (f"  ({rows} rows)" if rows else ""))
+
+def bench_size(size, args):
+    #Imported here, after main() has pointed OPENAI_BASE_URL at the fake server
+    import src.infer_email as infer_email
+    from main import CONTACTS_FILE, EMAILS_FILE, EVENTS_FILE, MESSAGES_FILE
+    from src.analytics import LeadAggregates
+    from src.company_index import CompanyIndex
+    from src.extract_events import get_event_data
+    from src.find_contacts import iter_contacts, load_companies, save_contacts
+    from src.generate_outreach import process_messages
+    from src.ingest_events import append_events, iter_exhibitors, replace_builtin_events
+    from src.lead_cache import CachedLeadFrame, filter_positions
+    from src.lead_store import LeadStore
+    from src.search_index import LeadSearchIndex
+    from src.streaming import write_csv
+
+    recorder = Recorder(size, quiet=not args.verbose)
+    events, directory, websites, known_emails = make_dataset(size, seed=args.seed)
+    print(f"\n{size} contacts ({len(events)} companies)")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            os.makedirs("data", exist_ok=True)
+            write_csv(known_emails, infer_email.KNOWN_EMAILS_PATH)
+            #the learned formats are a process wide singleton; start each size from its own corpus
+            infer_email._engine = None
+
+            #the synthetic companies arrive the way real ones do, as an exhibitor export
+            write_csv(events, "exhibitors.csv")
+            with recorder.stage("events_ingest", len(events)):
+                append_events(iter_exhibitors(["exhibitors.csv"]), EVENTS_FILE)
+            #the pipeline's events stage, which rewrites the whole file around the built-in rows
+            builtin = get_event_data()
+            with recorder.stage("events", len(events) + len(builtin)):
+                replace_builtin_events(builtin, EVENTS_FILE)
+            with recorder.stage("contacts", size):
+                index = CompanyIndex(directory, websites)
+                save_contacts(list(iter_contacts(load_companies(EVENTS_FILE), index)), CONTACTS_FILE)
+            with recorder.stage("emails", size):
+                infer_email.process_contacts(CONTACTS_FILE, EMAILS_FILE)
+            with recorder.stage("messages", size):
+                process_messages(EMAILS_FILE, MESSAGES_FILE, concurrency=args.concurrency,
+                                 batch_size=args.batch_size, use_cache=False, resume=False)
+            store = LeadStore("data/leads.sqlite")
+            with recorder.stage("store", size):
+                store.import_csv(MESSAGES_FILE)
+
+            #Dashboard data paths, without Streamlit in the way
+            leads = CachedLeadFrame(store)
+            with recorder.stage("dashboard_load", size):
+                df = leads.get()
+            lead_ids = list(df.index[:200])
+            for lead_id in lead_ids[:100]:
+                leads.update(lead_id, last_outreach_date="2026-01-01", next_followup_date="2026-01-08")
+            df = leads.get()
+
+            company = df["company"].iloc[0]
+            with recorder.stage("dashboard_filter", size):
+                for _ in range(10):
+                    filter_positions(df, None, outreach_filter="Sent", followup_filter="Due")
+                    filter_positions(df, company, outreach_filter="Not Sent")
+            with recorder.stage("search_index_build", size):
+                search_index = LeadSearchIndex(df)
+            with recorder.stage("search_queries", len(SEARCH_QUERIES)):
+                for query in SEARCH_QUERIES:
+                    search_index.search(query)
+            with recorder.stage("analytics_build", size):
+                LeadAggregates(df)
+            with recorder.stage("analytics_updates", 100):
+                for lead_id in lead_ids[100:200]:
+                    leads.update(lead_id, last_outreach_date="2026-01-02", next_followup_date="2026-01-09")
+                    leads.counts(company)
+        finally:
+            os.chdir(cwd)
+    return recorder.results
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {(r["size"], r["stage"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["size"], result["stage"]))
+        if not before:
+            continue
+        ratio = result["seconds"] / before
+        flag = "  <-- slower" if ratio > threshold else ""
+        print(f"  {result['size']:>7} {result['stage']:<24} {before:9.3f}s -> {result['seconds']:9.3f}s ({ratio:.2f}x){flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline and dashboard on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Contact counts to benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake OpenAI server latency per request, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake requests that fail with 429/5xx")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Result file (default: data/benchmarks/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    from src.fake_openai_server import make_server
+    from src.metrics import get_metrics
+    server = make_server(port=0, latency=args.latency, error_rate=args.error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP"] = "0"
+
+    results = []
+    try:
+        for size in args.sizes:
+            results.extend(bench_size(size, args))
+    finally:
+        server.shutdown()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "verbose")},
+        "results": results,
+        #latency histograms, retries and tokens for every fake OpenAI call made above
+        "openai_calls": get_metrics().report()["openai_calls"]
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📊 Results saved to {output}")
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
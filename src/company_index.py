@@ -0,0 +1,97 @@
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company",
+    "gmbh", "ag", "sa", "sas", "bv", "nv", "plc", "pty", "srl", "spa", "kg", "group", "holdings"
+}
+STOP_WORDS = {"the", "and", "of"}
+SECOND_LEVEL_SUFFIXES = {"co", "com", "org", "net", "ac", "gov", "edu"}
+
+FUZZY_THRESHOLD = 0.85
+
+def normalize_company(name):
+    """
+    "3M Company, Inc." -> "3m", "ORAFOL Europe GmbH" -> "orafol europe"
+    """
+    name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii").lower()
+    name = name.replace("&", " and ")
+    tokens = re.sub(r"[^a-z0-9]+", " ", name).split()
+    tokens = [token for token in tokens if token not in LEGAL_SUFFIXES and token not in STOP_WORDS]
+    return " ".join(tokens)
+
+def registered_domain(url):
+    """
+    "https://graphics.averydennison.com/en/" -> "averydennison.com"
+    """
+    if not url:
+        return ""
+    host = url.lower().split("//")[-1].split("/")[0].split(":")[0]
+    labels = [label for label in host.split(".") if label]
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+class CompanyIndex:
+    """
+    Resolves company names from event lists to entries in the contact directory.
+    Tries, in order: normalized name, website domain, then fuzzy matching restricted to
+    directory entries that share a first token (blocking), so resolving N companies stays near linear.
+    Companies that can't be resolved are collected in .unmatched rather than silently dropped.
+    """
+    def __init__(self, directory, websites=None):
+        self.directory = directory
+        self.by_key = {}
+        self.by_domain = {}
+        self.blocks = defaultdict(list)
+        self.unmatched = []
+
+        for name in directory:
+            key = normalize_company(name)
+            self.by_key.setdefault(key, name)
+            if key:
+                self.blocks[key.split()[0]].append((key, set(key.split()), name))
+        for name, website in (websites or {}).items():
+            domain = registered_domain(website)
+            if domain and name in directory:
+                self.by_domain.setdefault(domain, name)
+
+    def _fuzzy(self, key):
+        tokens = set(key.split())
+        best_name, best_score, tied = None, 0.0, False
+        for candidate_key, candidate_tokens, name in self.blocks.get(key.split()[0], []):
+            #"3m" should find "3m commercial graphics": every word of one name appears in the other
+            if tokens <= candidate_tokens or candidate_tokens <= tokens:
+                score = 1.0
+            else:
+                score = SequenceMatcher(None, key, candidate_key).ratio()
+            if score > best_score:
+                best_name, best_score, tied = name, score, False
+            elif score == best_score:
+                tied = True
+        if best_score >= FUZZY_THRESHOLD and not tied:
+            return best_name
+        return None
+
+    def resolve(self, company_name, website=""):
+        """
+        Returns (directory name, how it matched) or (None, None).
+        """
+        key = normalize_company(company_name)
+        if key in self.by_key:
+            return self.by_key[key], "name"
+        domain = registered_domain(website)
+        if domain in self.by_domain:
+            return self.by_domain[domain], "domain"
+        if key:
+            match = self._fuzzy(key)
+            if match:
+                return match, "fuzzy"
+        self.unmatched.append({"company": company_name, "website": website})
+        return None, None
+
+    def contacts_for(self, company_name, website=""):
+        match, _ = self.resolve(company_name, website)
+        return self.directory.get(match, []) if match else []
@@ -1,61 +1,69 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from openai import OpenAI
-from dotenv import load_dotenv
 import os
-import pyperclip
-import altair as alt
+import sys
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+#streamlit runs this file as a script, so make the project root importable for the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.activity_log import ActivityLog, backfill_from_leads, format_event
+from src.followups import FOLLOWUP_INTERVAL_DAYS, SNOOZE_DAYS, BulkFollowupJob, due_leads, stream_followup_message
+from src.lead_cache import CachedLeadFrame, filter_positions
+from src.lead_store import LeadStore, STORE_PATH
+from src.metrics import get_metrics, set_job
+from src.search_index import LeadSearchIndex
 
 DATA_PATH = "data/contacts_with_messages.csv"
 
-def generate_followup_message(name, title, company):
-    prompt = f"""
-    Write a short and polite follow up message to {name}, the {title} at {company}.
-    Assume you previously reached out about DuPont Tedlar protective films for signage, and haven't heard back.
-    Make sure it is professional, polite and friendly, and include a soft invitation to connect. 
-    """
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error generating follow-up: {e}"
+#Dashboard calls are reported separately from pipeline runs, in data/metrics/dashboard*
+set_job("dashboard")
+
+def open_store():
+    #The pipeline fills the store, but older runs only left the CSV behind, so import it once if needed
+    store = LeadStore(STORE_PATH)
+    if store.count() == 0 and os.path.exists(DATA_PATH):
+        store.import_csv(DATA_PATH)
+    return store
+
+@st.cache_resource
+def get_lead_frame():
+    #Shared by every rerun and session; reloads itself only when the store version changes
+    return CachedLeadFrame(open_store())
+
+@st.cache_resource
+def get_activity_log():
+    #One tailing reader per process; each rerun only parses lines appended since the last one
+    log = ActivityLog()
+    if not log.exists():
+        backfill_from_leads(log, get_lead_frame().get())
+    return log
+
+@st.cache_resource(max_entries=1)
+def get_search_index(generation, _df):
+    #Dashboard writes never touch name/title/company, so the index only needs rebuilding on a full reload
+    return LeadSearchIndex(_df)
+
+def copy_to_clipboard(text):
+    #Imported on first copy; most reruns never touch the clipboard
+    import pyperclip
+    pyperclip.copy(text)
+
+@st.cache_resource
+def get_bulk_jobs():
+    #Process wide, so every session sees a running bulk job and nobody starts a second one
+    return {}
 
 def main():
     st.title("Lead Outreach Dashboard")
 
-    if 'activity_log' not in st.session_state:
-        st.session_state['activity_log'] = []
-
-    if not os.path.exists(DATA_PATH):
+    leads = get_lead_frame()
+    #A snapshot shared by every session; it is never modified, so it is read, not copied
+    with get_metrics().stage("dashboard_load"):
+        df = leads.get()
+    if df.empty:
         st.error("No contact data found. Please generate contacts/messages first.")
         return
 
-    df = pd.read_csv(DATA_PATH)
-    df["last_outreach_date"] = pd.to_datetime(df["last_outreach_date"], errors="coerce")
-    df["next_followup_date"] = pd.to_datetime(df["next_followup_date"], errors="coerce")
-
-    if 'activity_log_initialized' not in st.session_state:
-        st.session_state['activity_log'] = []
-        for _, row in df.iterrows():
-            if pd.notna(row["last_outreach_date"]):
-                timestamp = row["last_outreach_date"].strftime("%Y-%m-%dT%H:%M:%S")
-                log = f"[{timestamp}] Marked {row['name']} ({row['title']}, {row['company']}) as contacted."
-                st.session_state['activity_log'].append(log)
-        st.session_state['activity_log_initialized'] = True
-
-    for idx in range(len(df)):
-        sent_flag = f"sent_{idx}"
-        if isinstance(st.session_state.get(sent_flag), dict):
-            df.at[idx, "last_outreach_date"] = st.session_state[sent_flag]["last_outreach_date"]
-            df.at[idx, "next_followup_date"] = st.session_state[sent_flag]["next_followup_date"]
-
     companies = sorted(df["company"].unique())
     selected_company = st.sidebar.selectbox("🏢 Select a company to view its contacts", ["None", "All"] + companies)
 
@@ -63,68 +71,55 @@ def main():
     search_term = st.sidebar.text_input("Search by name, title, or company")
     outreach_filter = st.sidebar.selectbox("Filter by Outreach Status", ["All", "Sent", "Not Sent"])
     followup_filter = st.sidebar.selectbox("Filter by Follow-Up Status", ["All", "Due", "Not Due"])
+    refresh_followups = st.sidebar.checkbox("Always write fresh follow-ups (skip cache)")
 
     if selected_company == "None":
         st.info("👈 Use the sidebar to select a company or search across all leads.")
         return
 
-    company_df = df if selected_company == "All" else df[df["company"] == selected_company]
-    filtered_df = company_df.copy()
-
-    if search_term:
-        search_term = search_term.lower()
-        filtered_df = filtered_df[
-            filtered_df["name"].str.lower().str.contains(search_term) |
-            filtered_df["title"].str.lower().str.contains(search_term) |
-            filtered_df["company"].str.lower().str.contains(search_term)
-        ]
-
-    if outreach_filter != "All":
-        sent_mask = filtered_df["last_outreach_date"].notna()
-        if outreach_filter == "Sent":
-            filtered_df = filtered_df[sent_mask]
-        elif outreach_filter == "Not Sent":
-            filtered_df = filtered_df[~sent_mask]
-
-    if followup_filter != "All":
-        today = datetime.now().date()
-        followup_dates = pd.to_datetime(filtered_df["next_followup_date"], errors="coerce")
-        if followup_filter == "Due":
-            filtered_df = filtered_df[followup_dates <= pd.to_datetime(today)]
-        elif followup_filter == "Not Due":
-            filtered_df = filtered_df[followup_dates > pd.to_datetime(today)]
-
-    # --- Analytics ---
-    st.sidebar.header("📊 Analytics")
-    total_leads = len(company_df)
-    sent_count = company_df["last_outreach_date"].notna().sum()
-    followups_due = (company_df["next_followup_date"] <= pd.to_datetime(datetime.now().date())).sum()
-
-    st.sidebar.metric("Total Leads", total_leads)
-    st.sidebar.metric("Outreach Sent", sent_count)
-    st.sidebar.metric("Follow-Ups Due", followups_due)
+    with get_metrics().stage("dashboard_filter"):
+        matches = get_search_index(leads.generation, df).search(search_term) if search_term else None
+        #row positions only; the rows themselves are taken a page at a time
+        positions = filter_positions(
+            df, None if selected_company == "All" else selected_company, matches, outreach_filter, followup_filter
+        )
+
+    render_bulk_followups(leads, df, refresh_followups)
 
     st.sidebar.subheader("📖 Activity Log")
     with st.sidebar.expander("View Activity Log"):
-        for log_entry in st.session_state.get('activity_log', []):
+        activity_log = get_activity_log()
+        activity_log.refresh()
+        log_pages = max(1, -(-len(activity_log) // ACTIVITY_PAGE_SIZE))
+        log_page = st.number_input(f"Page (of {log_pages})", min_value=1, max_value=log_pages, key="activity_log_page")
+        for entry in activity_log.page(log_page, ACTIVITY_PAGE_SIZE):
             try:
-                log_date = log_entry.split(']')[0][1:]
-                log_message = log_entry.split(']')[1].strip()
-                log_date_parsed = datetime.fromisoformat(log_date)
-                log_display = f"{log_date_parsed.strftime('%A, %B %d (%Y) %I:%M %p')}: {log_message}"
-                st.markdown(f"- {log_display}")
-            except:
-                st.markdown(f"- {log_entry}")
+                log_date = datetime.fromisoformat(entry["ts"]).strftime('%A, %B %d (%Y) %I:%M %p')
+            except (KeyError, ValueError):
+                log_date = entry.get("ts", "")
+            st.markdown(f"- {log_date}: {format_event(entry)}")
+
+    render_analytics(leads, None if selected_company == "All" else selected_company)
+
+    render_lead_list(df, positions, leads, refresh_followups)
+
+def render_analytics(leads, company):
+    #Drawn on full reruns only; the card actions that change these numbers (mark as sent, snooze) ask for one.
+    #The counts are maintained incrementally, so drawing them is cheap
+    counts = leads.counts(company)
 
     st.subheader("📈 Outreach Analytics")
+    total_col, sent_col, due_col = st.columns(3)
+    total_col.metric("Total Leads", counts["total"])
+    sent_col.metric("Outreach Sent", counts["sent"])
+    due_col.metric("Follow-Ups Due", counts["due"])
+
     with st.container():
         chart_data = pd.DataFrame({
             "Status": ["Sent", "Not Sent"],
-            "Count": [
-                company_df["last_outreach_date"].notna().sum(),
-                company_df["last_outreach_date"].isna().sum()
-            ]
+            "Count": [counts["sent"], counts["not_sent"]]
         })
+        import altair as alt
         chart = alt.Chart(chart_data).mark_bar().encode(
             x=alt.X("Status", sort=None),
             y="Count",
@@ -132,130 +127,206 @@ def main():
         ).properties(width=400, height=300)
         st.altair_chart(chart, use_container_width=True)
 
-        today = datetime.now().date()
-        followup_dates = pd.to_datetime(company_df["next_followup_date"], errors="coerce")
-        due_count = (followup_dates <= pd.to_datetime(today)).sum()
-        not_due_count = (followup_dates > pd.to_datetime(today)).sum()
-
         st.subheader("📬 Follow-Up Status")
         st.dataframe(pd.DataFrame({
             "Follow-Up": ["Due", "Not Due"],
-            "Count": [due_count, not_due_count]
+            "Count": [counts["due"], counts["not_due"]]
         }))
 
-    for idx, row in filtered_df.iterrows():
-        df_idx = row.name
-
-        st.divider()
-        st.subheader(f"{row['name']} – {row['title']} at {row['company']}")
-        st.markdown(f"[LinkedIn Profile]({row['linkedin_url']})")
-
-        sent_flag = f"sent_{idx}"
-        sent_data = st.session_state.get(sent_flag, None)
-        if isinstance(sent_data, dict):
-            row["last_outreach_date"] = sent_data["last_outreach_date"]
-            row["next_followup_date"] = sent_data["next_followup_date"]
-            outreach_sent = True
-        else:
-            outreach_sent = pd.notna(row.get("last_outreach_date"))
-
-        followup_due = False
-        days_remaining = None
-        just_marked_sent = False
-
-        with st.expander("✉️ Initial Message"):
-            initial_message = st.text_area(
-                f"Edit Initial Outreach ({row['name']})",
-                value=row.get("outreach_message", ""),
-                key=f"initial_msg_{idx}"
-            )
-            row["outreach_message"] = initial_message
-            df.loc[df_idx, "outreach_message"] = initial_message
-
-            if st.button(f"📋 Copy Initial Message ({row['name']})", key=f"copy_initial_{idx}"):
-                pyperclip.copy(initial_message)
-                st.success("Initial outreach message copied to clipboard!")
-
-        if not outreach_sent:
-            if st.button(f"✅ Mark as Sent ({row['name']})", key=f"sent_btn_{idx}"):
-                today = datetime.now().date()
-                last_outreach = today.isoformat()
-                next_followup = (today + timedelta(days=7)).isoformat()
+def render_bulk_followups(leads, base_df, refresh_followups):
+    st.sidebar.subheader("🪄 Bulk Follow-Ups")
+    jobs = get_bulk_jobs()
+    job = jobs.get("followups")
+    if job is None or not job.running:
+        missing_only = st.sidebar.checkbox("Only leads without a draft", value=True, key="bulk_missing_only")
+        targets = due_leads(base_df, missing_only=missing_only)
+        if st.sidebar.button(f"Generate follow-ups for all due leads ({len(targets)})", disabled=targets.empty, key="bulk_start"):
+            rows = zip(targets.index, targets["name"], targets["title"], targets["company"], targets["followup_message"].fillna(""))
+            jobs["followups"] = BulkFollowupJob(leads, get_activity_log(), rows, refresh_cache=refresh_followups).start()
+            st.rerun()
+    if jobs.get("followups") is not None:
+        with st.sidebar:
+            if jobs["followups"].running:
+                render_bulk_progress(jobs["followups"])
+            else:
+                show_bulk_summary(jobs["followups"].progress())
+
+@st.fragment(run_every=1)
+def render_bulk_progress(job):
+    #Polls the background job once a second without rerunning the rest of the page
+    progress = job.progress()
+    if not progress["running"]:
+        #one full rerun so the lead list picks up the new drafts
+        st.rerun()
+    st.progress(progress["done"] / max(progress["total"], 1), text=f"Generated {progress['done']} of {progress['total']} follow-ups")
+    if st.button("Stop", key="bulk_stop", disabled=progress["cancelled"]):
+        job.cancel()
+
+def show_bulk_summary(progress):
+    verb = "Stopped after" if progress["cancelled"] else "Finished"
+    st.caption(f"{verb} {progress['done']} of {progress['total']} follow-ups in {progress['elapsed']:.0f}s ({progress['failed']} failed).")
+
+PAGE_SIZES = [10, 25, 50, 100]
+ACTIVITY_PAGE_SIZE = 20
+TABLE_COLUMNS = ["name", "title", "company", "outreach_method", "last_outreach_date", "next_followup_date"]
+
+def render_lead_list(df, positions, leads, refresh_followups):
+    #Only the current page is ever rendered, so the cost doesn't grow with the number of leads
+    st.divider()
+    view_col, size_col, page_col = st.columns([2, 1, 1])
+    view_mode = view_col.radio("View", ["Table", "Cards"], horizontal=True, key="lead_view_mode")
+    page_size = size_col.selectbox("Leads per page", PAGE_SIZES, key="lead_page_size")
+    page_count = max(1, -(-len(positions) // page_size))
+    if st.session_state.get("lead_page", 1) > page_count:
+        #filters changed and the old page no longer exists
+        st.session_state["lead_page"] = page_count
+    page = page_col.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key="lead_page")
+
+    start = (page - 1) * page_size
+    page_df = df.iloc[positions[start:start + page_size]]
+    st.caption(f"Showing leads {min(start + 1, len(positions))}–{start + len(page_df)} of {len(positions)}")
+
+    if view_mode == "Cards":
+        for lead_id in page_df.index:
+            render_lead_card(lead_id, leads, refresh_followups)
+        return
 
-                st.session_state[sent_flag] = {
-                    "last_outreach_date": last_outreach,
-                    "next_followup_date": next_followup
-                }
+    selection = st.dataframe(
+        page_df[TABLE_COLUMNS],
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"lead_table_{page}_{page_size}"
+    )
+    selected_rows = selection.selection.rows
+    if selected_rows:
+        render_lead_card(page_df.index[selected_rows[0]], leads, refresh_followups)
+    else:
+        st.info("Select a lead in the table to see its messages and actions.")
+
+@st.fragment
+def render_lead_card(lead_id, leads, refresh_followups):
+    #A fragment: the card's buttons and text areas rerun only this card, never the whole page.
+    #The row is read from the shared frame each time, which already holds this card's own writes
+    df = leads.get()
+    if lead_id not in df.index:
+        #the store was reloaded without this lead
+        return
+    row = df.loc[lead_id].copy()
 
-                row["last_outreach_date"] = last_outreach
-                row["next_followup_date"] = next_followup
-                df.loc[df_idx, "last_outreach_date"] = last_outreach
-                df.loc[df_idx, "next_followup_date"] = next_followup
+    st.divider()
+    st.subheader(f"{row['name']} – {row['title']} at {row['company']}")
+    st.markdown(f"[LinkedIn Profile]({row['linkedin_url']})")
 
-                log_message = f"[{datetime.now()}] Marked {row['name']} ({row['title']}, {row['company']}) as contacted."
-                st.session_state['activity_log'].append(log_message)
+    outreach_sent = pd.notna(row.get("last_outreach_date"))
 
-                df.to_csv(DATA_PATH, index=False)
+    followup_due = False
+    days_remaining = None
 
-                st.rerun()
+    with st.expander("✉️ Initial Message"):
+        initial_message = st.text_area(
+            f"Edit Initial Outreach ({row['name']})",
+            value=row.get("outreach_message", ""),
+            key=f"initial_msg_{lead_id}"
+        )
+        if initial_message != row.get("outreach_message", ""):
+            leads.update(lead_id, outreach_message=initial_message)
+        row["outreach_message"] = initial_message
+
+        if st.button(f"📋 Copy Initial Message ({row['name']})", key=f"copy_initial_{lead_id}"):
+            copy_to_clipboard(initial_message)
+            st.success("Initial outreach message copied to clipboard!")
+
+    if not outreach_sent:
+        if st.button(f"✅ Mark as Sent ({row['name']})", key=f"sent_btn_{lead_id}"):
+            today = datetime.now().date()
+            last_outreach = today.isoformat()
+            next_followup = (today + timedelta(days=FOLLOWUP_INTERVAL_DAYS)).isoformat()
+
+            get_activity_log().append(
+                "mark_sent", int(lead_id), row['name'], row['title'], row['company'],
+                next_followup_date=next_followup
+            )
 
-        if outreach_sent:
-            try:
-                next_followup = row.get("next_followup_date") or st.session_state.get(sent_flag, {}).get("next_followup_date")
-                if isinstance(next_followup, str):
-                    followup_date = datetime.fromisoformat(next_followup).date()
+            leads.update(lead_id, last_outreach_date=last_outreach, next_followup_date=next_followup)
+            #the analytics and the sent/due filters depend on these dates, so this one action reruns the page
+            st.toast(f"Marked {row['name']} as sent.")
+            st.rerun()
+
+    if outreach_sent:
+        try:
+            next_followup = row.get("next_followup_date")
+            if isinstance(next_followup, str):
+                followup_date = datetime.fromisoformat(next_followup).date()
+            else:
+                followup_date = next_followup.date()
+            today = datetime.now().date()
+            followup_due = followup_date <= today
+            days_remaining = (followup_date - today).days
+        except:
+            followup_due = False
+
+        if days_remaining and days_remaining > 0:
+            st.info(f"⏳ {days_remaining} days until follow-up.")
+        if followup_due:
+            st.warning("⏰ Time to follow up!")
+
+        generate_key = f"generate_followup_{lead_id}"
+        followup_key = f"followup_text_{lead_id}"
+
+        if followup_due or not st.session_state.get(followup_key, '').strip():
+            if st.button(f"🪄 Generate Follow-Up ({row['name']})", key=generate_key):
+                #Tokens show up as they arrive; if the rep clicks something else meanwhile, Streamlit stops
+                #this run, the stream is closed and nothing is saved
+                preview = st.empty()
+                try:
+                    followup = preview.write_stream(
+                        stream_followup_message(row['name'], row['title'], row['company'], refresh_cache=refresh_followups)
+                    ) or ""
+                except Exception as e:
+                    preview.error(f"Error generating follow-up: {e}")
                 else:
-                    followup_date = next_followup.date()
-                today = datetime.now().date()
-                followup_due = followup_date <= today
-                days_remaining = (followup_date - today).days
-            except:
-                followup_due = False
-
-            if days_remaining and days_remaining > 0:
-                st.info(f"⏳ {days_remaining} days until follow-up.")
-            if followup_due:
-                st.warning("⏰ Time to follow up!")
-
-            generate_key = f"generate_followup_{idx}"
-            followup_key = f"followup_text_{idx}"
-
-            if just_marked_sent or followup_due or not st.session_state.get(followup_key, '').strip():
-                if st.button(f"🪄 Generate Follow-Up ({row['name']})", key=generate_key):
-                    with st.spinner("Generating follow-up message..."):
-                        followup = generate_followup_message(row['name'], row['title'], row['company'])
-                        st.session_state[followup_key] = followup
-                        row["followup_message"] = followup
-                        df.loc[df_idx, "followup_message"] = followup
-                        df.to_csv(DATA_PATH, index=False)
+                    preview.empty()
+                    followup = followup.strip()
+                    st.session_state[followup_key] = followup
+                    row["followup_message"] = followup
+                    leads.update(lead_id, followup_message=followup)
+                    get_activity_log().append("followup_generated", int(lead_id), row['name'], row['title'], row['company'])
                     st.success("Follow-up message generated!")
+                finally:
+                    get_metrics().write()
 
-        followup_msg = st.session_state.get(f"followup_text_{idx}", row.get("followup_message", ""))
+    followup_msg = st.session_state.get(f"followup_text_{lead_id}", row.get("followup_message", ""))
 
-        if isinstance(followup_msg, str) and followup_msg.strip():
-            followup_key = f"followup_text_{idx}"
+    if isinstance(followup_msg, str) and followup_msg.strip():
+        followup_key = f"followup_text_{lead_id}"
 
-            if followup_key not in st.session_state:
-                st.session_state[followup_key] = followup_msg
+        if followup_key not in st.session_state:
+            st.session_state[followup_key] = followup_msg
 
-            followup_text = st.text_area(
-                f"✍️ Edit Follow-Up Message ({row['name']})",
-                key=followup_key
-            )
+        followup_text = st.text_area(
+            f"✍️ Edit Follow-Up Message ({row['name']})",
+            key=followup_key
+        )
 
-            row["followup_message"] = followup_text
-            df.loc[df_idx, "followup_message"] = followup_text
+        if followup_text != row.get("followup_message", ""):
+            leads.update(lead_id, followup_message=followup_text)
+        row["followup_message"] = followup_text
 
-            if st.button(f"📋 Copy Follow-Up to Clipboard ({row['name']})", key=f"copy_followup_{idx}"):
-                pyperclip.copy(followup_text)
-                st.success("Follow-up message copied to clipboard!")
+        if st.button(f"📋 Copy Follow-Up to Clipboard ({row['name']})", key=f"copy_followup_{lead_id}"):
+            copy_to_clipboard(followup_text)
+            st.success("Follow-up message copied to clipboard!")
 
-            if st.button(f"😴 Snooze 3 Days ({row['name']})", key=f"snooze_{idx}"):
-                new_date = datetime.now().date() + timedelta(days=3)
-                row["next_followup_date"] = new_date.isoformat()
-                df.loc[df_idx, "next_followup_date"] = new_date
-                st.success(f"Snoozed. Next follow-up set for {new_date}.")
-                df.to_csv(DATA_PATH, index=False)
+        if st.button(f"😴 Snooze {SNOOZE_DAYS} Days ({row['name']})", key=f"snooze_{lead_id}"):
+            new_date = datetime.now().date() + timedelta(days=SNOOZE_DAYS)
+            leads.update(lead_id, next_followup_date=new_date.isoformat())
+            get_activity_log().append(
+                "snooze", int(lead_id), row['name'], row['title'], row['company'],
+                next_followup_date=new_date.isoformat()
+            )
+            #like mark as sent, this moves the lead between due and not due
+            st.toast(f"Snoozed. Next follow-up set for {new_date}.")
+            st.rerun()
 
 if __name__ == "__main__":
     main()
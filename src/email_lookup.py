@@ -0,0 +1,147 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote_plus, urlsplit
+import httpx
+from bs4 import BeautifulSoup
+
+LOOKUP_CACHE_PATH = "data/email_format_lookup.sqlite"
+LOOKUP_TTL_SECONDS = 30 * 24 * 60 * 60
+#"nothing found" is remembered for less time, the page might get indexed later
+NEGATIVE_TTL_SECONDS = 24 * 60 * 60
+
+#{query} is "<company> email format"; {domain} and {company} are also available
+LOOKUP_URL_TEMPLATE = os.getenv("EMAIL_FORMAT_LOOKUP_URL", "https://html.duckduckgo.com/html/?q={query}")
+
+MAX_CONNECTIONS = 20
+PER_HOST_LIMIT = 2
+REQUEST_TIMEOUT = 10.0
+
+FORMAT_PATTERN = re.compile(r"\{?\b(first|last|f|l)\}?\s*([._-]?)\s*\{?(first|last|f|l)?\}?\s*@")
+
+def parse_email_format(html, known_formats):
+    """
+    Pulls the most often mentioned format (first.last@..., {f}{last}@..., ...) out of a results page.
+    Returns None if nothing on the page looks like a known format.
+    """
+    text = BeautifulSoup(html, "html.parser").get_text(" ").lower()
+    votes = Counter()
+    for head, separator, tail in FORMAT_PATTERN.findall(text):
+        fmt = f"{head}{separator}{tail}"
+        if fmt in known_formats:
+            votes[fmt] += 1
+    if not votes:
+        return None
+    return votes.most_common(1)[0][0]
+
+class EmailFormatLookup:
+    """
+    Looks up email formats online for many domains at once.
+    Each domain is fetched at most once per TTL (results, including misses, are kept in SQLite),
+    and requests fan out over one pooled async client with a per-host concurrency cap.
+    """
+    def __init__(self, known_formats, cache_path=LOOKUP_CACHE_PATH, url_template=LOOKUP_URL_TEMPLATE,
+                 max_connections=MAX_CONNECTIONS, per_host_limit=PER_HOST_LIMIT, timeout=REQUEST_TIMEOUT):
+        self.known_formats = set(known_formats)
+        self.url_template = url_template
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        #everything resolved during this run, failures included, so a domain is tried once per run
+        self._results = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS lookups (
+                domain TEXT PRIMARY KEY,
+                email_format TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def cached(self, domain):
+        """
+        Returns (found, email_format); found is False when the domain needs fetching.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT email_format, fetched_at FROM lookups WHERE domain = ?", (domain,)).fetchone()
+        if row is None:
+            return False, None
+        email_format, fetched_at = row
+        ttl = LOOKUP_TTL_SECONDS if email_format else NEGATIVE_TTL_SECONDS
+        if time.time() - fetched_at > ttl:
+            return False, None
+        return True, email_format
+
+    def _store(self, domain, email_format):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lookups (domain, email_format, fetched_at) VALUES (?, ?, ?)",
+                (domain, email_format, time.time())
+            )
+            self._conn.commit()
+
+    def lookup_url(self, company, domain):
+        query = quote_plus(f"{company or domain} email format")
+        return self.url_template.format(query=query, domain=quote_plus(domain), company=quote_plus(company or ""))
+
+    async def _fetch(self, client, host_limits, company, domain):
+        url = self.lookup_url(company, domain)
+        host = urlsplit(url).netloc
+        limit = host_limits.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with limit:
+            try:
+                response = await client.get(url, follow_redirects=True)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                #transient failures are not cached, so the next run tries again
+                print(f"Email format lookup failed for {domain}: {e}")
+                return domain, None, False
+        return domain, parse_email_format(response.text, self.known_formats), True
+
+    async def _fetch_all(self, pending):
+        host_limits = {}
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        headers = {"User-Agent": "Mozilla/5.0 (lead research prototype)"}
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout, headers=headers) as client:
+            tasks = [self._fetch(client, host_limits, company, domain) for domain, company in pending.items()]
+            return await asyncio.gather(*tasks)
+
+    def lookup_many(self, companies_by_domain):
+        """
+        companies_by_domain maps domain -> company name. Returns domain -> format (or None).
+        """
+        results = {}
+        pending = {}
+        for domain, company in companies_by_domain.items():
+            if not domain:
+                continue
+            if domain in self._results:
+                results[domain] = self._results[domain]
+                continue
+            found, email_format = self.cached(domain)
+            if found:
+                results[domain] = email_format
+            else:
+                pending[domain] = company
+
+        if pending:
+            print(f"Looking up email formats for {len(pending)} domains...")
+            for domain, email_format, ok in asyncio.run(self._fetch_all(pending)):
+                results[domain] = email_format
+                if ok:
+                    self._store(domain, email_format)
+        self._results.update(results)
+        return results
+
+    def lookup(self, company, domain):
+        return self.lookup_many({domain: company}).get(domain)
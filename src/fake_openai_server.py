@@ -0,0 +1,126 @@
+"""
+Minimal local stand in for the OpenAI chat completions endpoint.
+Useful for exercising concurrency, rate limiting and retries without spending API credits:
+
+    python -m src.fake_openai_server --port 8001 --latency 0.5 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=test python main.py --concurrency 8
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+    token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def usage(self, prompt, content):
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def send_stream(self, request, content, usage):
+        #Server-sent events, one word per chunk, like the real streaming API
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        base = {
+            "id": f"chatcmpl-fake-{random.randint(0, 10**9)}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4")
+        }
+        pieces = [{"role": "assistant", "content": ""}] + [{"content": word} for word in re.findall(r"\S+\s*", content)]
+        try:
+            for delta in pieces:
+                chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+            chunk = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=usage))}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            #the client cancelled the stream
+            pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            status = random.choice([429, 500, 503])
+            headers = {"Retry-After": "0"} if status == 429 else None
+            self.send_json(status, {"error": {"message": "Simulated failure", "type": "fake_error"}}, headers)
+            return
+
+        prompt = " ".join(message.get("content", "") for message in request.get("messages", []))
+        content = f"Hi there, this is a fake reply to a {len(prompt)} character prompt."
+        if "JSON array" in prompt:
+            #batched outreach prompts list contacts as "- id <n>: ..."
+            contact_ids = re.findall(r"^\s*- id (\S+):", prompt, flags=re.MULTILINE)
+            content = json.dumps([{"id": contact_id, "message": f"Hi there, fake message for contact {contact_id}."}
+                                  for contact_id in contact_ids])
+        if request.get("stream"):
+            self.send_stream(request, content, self.usage(prompt, content))
+            return
+
+        self.send_json(200, {
+            "id": f"chatcmpl-fake-{random.randint(0, 10**9)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": self.usage(prompt, content)
+        })
+
+def make_server(host="127.0.0.1", port=8001, latency=0.0, error_rate=0.0, token_delay=0.0):
+    handler = type("ConfiguredFakeOpenAIHandler", (FakeOpenAIHandler,), {
+        "latency": latency,
+        "error_rate": error_rate,
+        "token_delay": token_delay
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail with 429/5xx")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.error_rate, args.token_delay)
+    print(f"Fake OpenAI server listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
@@ -1,5 +1,8 @@
 import csv
 import os
+from src.company_index import CompanyIndex
+from src.sharding import shard_rows
+from src.streaming import write_csv
 
 company_contacts = {
     "Avery Dennison": [
@@ -113,26 +116,41 @@ company_contacts = {
     ]
 }
 
-def load_companies(filename="data/events_companies.csv"):
-    companies = []
+#Lets event companies be matched by website when their names differ from the directory's
+company_websites = {
+    "Avery Dennison": "https://graphics.averydennison.com",
+    "3M Commercial Graphics": "https://www.3m.com",
+    "Orafol": "https://www.orafol.com",
+    "Arlon Graphics": "https://www.arlon.com",
+    "Flexcon": "https://www.flexcon.com",
+    "Nekoosa": "https://www.nekoosa.com",
+    "LSI Industries": "https://www.lsicorp.com"
+}
+
+def build_company_index():
+    return CompanyIndex(company_contacts, company_websites)
+
+def iter_companies(filename="data/events_companies.csv"):
     with open(filename, newline="") as csvfile:
         reader = csv.DictReader(csvfile)
         for row in reader:
-            companies.append(row)
-    return companies
+            yield row
+
+def load_companies(filename="data/events_companies.csv"):
+    return list(iter_companies(filename))
 
-def generate_contacts(companies):
-    contacts = []
+def iter_contacts(companies, index=None):
+    index = index or build_company_index()
     for company in companies:
         company_name = company["company"]
         website = company["website"]
         event = company.get("event", "")
         rationale = company.get("rationale", "")
 
-        contact_list = company_contacts.get(company_name, [])
+        contact_list = index.contacts_for(company_name, website)
 
         for contact in contact_list:
-            contacts.append({
+            yield {
                 "name": contact["name"],
                 "title": contact["title"],
                 "linkedin_url": contact["linkedin_url"],
@@ -140,16 +158,39 @@ def generate_contacts(companies):
                 "company_website": website,
                 "event": event,
                 "rationale": rationale
-            })
+            }
+
+def generate_contacts(companies, shard=None):
+    #shard is (i, N) to keep only that shard's contacts, see src/sharding.py
+    index = build_company_index()
+    contacts = iter_contacts(companies, index)
+    if shard is not None:
+        contacts = shard_rows(contacts, shard)
+    contacts = list(contacts)
+    report_unmatched(index)
     return contacts
 
-def save_contacts(contacts, filename="data/contacts.csv"):
-    os.makedirs("data", exist_ok=True)
+def report_unmatched(index, filename="data/unmatched_companies.csv"):
+    #Companies with no directory entry are written out so they can be added, not silently skipped
+    #(once each, however many times the events list them)
+    unmatched = list({(row["company"], row["website"]): row for row in index.unmatched}.values())
+    if not unmatched:
+        #a report left over from an earlier run would list companies that resolve now
+        if os.path.exists(filename):
+            os.remove(filename)
+        return
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
     with open(filename, mode="w", newline="") as csvfile:
-        fieldnames = contacts[0].keys()
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer = csv.DictWriter(csvfile, fieldnames=["company", "website"])
         writer.writeheader()
-        writer.writerows(contacts)
+        writer.writerows(unmatched)
+    print(f"⚠️ {len(unmatched)} companies had no contacts in the directory, see {filename}")
+
+def save_contacts(contacts, filename="data/contacts.csv"):
+    #write_csv copes with an empty list, which a shard with no companies produces
+    write_csv(contacts, filename)
 
 if __name__ == "__main__":
     companies = load_companies()
@@ -0,0 +1,177 @@
+"""
+Background process that drafts follow-ups before they come due, so the draft is already in the
+dashboard when a rep opens the lead:
+
+    python main.py scheduler --lead-days 1
+    python -m src.followup_scheduler --once      # draft whatever is ready now and exit (e.g. from cron)
+
+Leads sit in a priority queue ordered by the day their draft is due (follow-up date minus the lead
+time). The store is read once at start up; after that, snoozes and reschedules arrive through the
+activity log the dashboard already writes, so the lead table is never rescanned.
+"""
+
+import argparse
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from src.activity_log import ACTIVITY_LOG_PATH, ActivityLog
+from src.followups import BULK_CONCURRENCY, followup_prompt
+from src.lead_store import STORE_PATH, LeadStore
+from src.llm import chat_completion
+from src.metrics import get_metrics, set_job
+
+DRAFT_LEAD_DAYS = int(os.getenv("FOLLOWUP_DRAFT_LEAD_DAYS", "1"))
+POLL_SECONDS = 30
+#A failed draft is tried again after this long instead of blocking the queue
+RETRY_SECONDS = 15 * 60
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+class FollowupScheduler:
+    """
+    heap holds (draft day, lead id, follow-up day); scheduled maps each lead to its current follow-up day.
+    A reschedule just pushes a new entry, and entries that no longer match scheduled are skipped when popped.
+    """
+    def __init__(self, store, activity_log, lead_days=DRAFT_LEAD_DAYS, concurrency=BULK_CONCURRENCY):
+        self.store = store
+        self.activity_log = activity_log
+        self.lead_days = lead_days
+        self.concurrency = concurrency
+        self.heap = []
+        self.scheduled = {}
+        self.retry_at = {}
+        self.offset = 0
+        self._stop = threading.Event()
+
+    def load(self):
+        #Start tailing from the current end of the log first, so nothing written during the scan is missed
+        _, self.offset = self.activity_log.read_since(0)
+        for lead_id, followup_date in self.store.scheduled_followups():
+            self.schedule(lead_id, followup_date)
+        return len(self.scheduled)
+
+    def schedule(self, lead_id, followup_date):
+        day = parse_day(followup_date)
+        if day is None:
+            self.scheduled.pop(lead_id, None)
+            return
+        self.scheduled[lead_id] = day
+        heapq.heappush(self.heap, (day - timedelta(days=self.lead_days), lead_id, day))
+
+    def apply_events(self):
+        #Mark as sent and snooze both carry the new follow-up date
+        entries, self.offset = self.activity_log.read_since(self.offset)
+        for entry in entries:
+            if entry.get("lead_id") is not None and entry.get("next_followup_date"):
+                self.schedule(int(entry["lead_id"]), entry["next_followup_date"])
+        return len(entries)
+
+    def ready(self, today=None):
+        """
+        Pops every lead whose draft is due by today and still needs one.
+        The store row is checked on the way out, so a change the log didn't carry is still honoured.
+        """
+        today = today or date.today()
+        leads = []
+        while self.heap and self.heap[0][0] <= today:
+            _, lead_id, day = heapq.heappop(self.heap)
+            if self.scheduled.get(lead_id) != day:
+                continue
+            del self.scheduled[lead_id]
+            lead = self.store.get_lead(lead_id)
+            if lead is None or lead["followup_message"].strip():
+                continue
+            if parse_day(lead["next_followup_date"]) != day:
+                self.schedule(lead_id, lead["next_followup_date"])
+                continue
+            leads.append(lead)
+        return leads
+
+    def draft(self, lead):
+        #Returns the draft, or None if the call failed
+        try:
+            followup = chat_completion(followup_prompt(lead["name"], lead["title"], lead["company"]), purpose="followup_scheduled")
+        except Exception as e:
+            print(f"⚠️ Follow-up draft failed for {lead['name']} ({lead['company']}): {e}")
+            return None
+        return followup.strip()
+
+    def run_once(self, today=None):
+        self.apply_events()
+        leads = self.ready(today)
+        if not leads:
+            return 0
+        with get_metrics().stage("scheduled_followups"), ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(self.draft, leads))
+        drafts = {}
+        for lead, followup in zip(leads, results):
+            if followup is None:
+                #back in the queue, but not before RETRY_SECONDS have passed
+                self.retry_at[lead["id"]] = (time.time() + RETRY_SECONDS, lead["next_followup_date"])
+            else:
+                drafts[lead["id"]] = followup
+
+        #One transaction and one version bump for the whole run, so dashboards reload once rather than per draft.
+        #The calls take a while; leads a rep wrote a follow-up for in the meantime keep theirs
+        saved = set(self.store.save_followup_drafts(drafts)[0]) if drafts else set()
+        for lead in leads:
+            if lead["id"] in saved:
+                self.activity_log.append("followup_generated", lead["id"], lead["name"], lead["title"], lead["company"], scheduled=True)
+        failed = len(leads) - len(drafts)
+        get_metrics().increment("followups_drafted", len(saved))
+        get_metrics().increment("followups_failed", failed)
+        get_metrics().write()
+        kept = f", kept {len(drafts) - len(saved)} written meanwhile" if len(saved) < len(drafts) else ""
+        print(f"🪄 Drafted {len(saved)} of {len(leads)} follow-ups{kept}")
+        return len(saved)
+
+    def requeue_failed(self):
+        now = time.time()
+        for lead_id, (when, followup_date) in list(self.retry_at.items()):
+            if when <= now:
+                del self.retry_at[lead_id]
+                if lead_id not in self.scheduled:
+                    self.schedule(lead_id, followup_date)
+
+    def run(self, poll_seconds=POLL_SECONDS):
+        while not self._stop.is_set():
+            self.requeue_failed()
+            self.run_once()
+            self._stop.wait(poll_seconds)
+
+    def stop(self):
+        self._stop.set()
+
+def run_scheduler(store_path=STORE_PATH, log_path=ACTIVITY_LOG_PATH, lead_days=DRAFT_LEAD_DAYS,
+                  poll_seconds=POLL_SECONDS, concurrency=BULK_CONCURRENCY, once=False):
+    set_job("scheduler")
+    scheduler = FollowupScheduler(LeadStore(store_path), ActivityLog(log_path), lead_days, concurrency)
+    print(f"📅 Tracking {scheduler.load()} scheduled follow-ups, drafting {lead_days} day(s) ahead")
+    if once:
+        scheduler.run_once()
+        return
+    try:
+        scheduler.run(poll_seconds)
+    except KeyboardInterrupt:
+        print("Scheduler stopped.")
+
+def add_scheduler_arguments(parser):
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--activity-log", default=ACTIVITY_LOG_PATH)
+    parser.add_argument("--lead-days", type=int, default=DRAFT_LEAD_DAYS, help="Draft follow-ups this many days before they are due")
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS, help="How often to check the activity log and the queue")
+    parser.add_argument("--concurrency", type=int, default=BULK_CONCURRENCY)
+    parser.add_argument("--once", action="store_true", help="Draft whatever is ready now and exit")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate follow-up drafts ahead of their due date")
+    add_scheduler_arguments(parser)
+    args = parser.parse_args()
+    run_scheduler(args.store, args.activity_log, args.lead_days, args.poll_seconds, args.concurrency, args.once)
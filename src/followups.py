@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.llm import chat_completion, stream_chat_completion
+from src.metrics import get_metrics
+from src.prompts import followup_messages
+
+BULK_CONCURRENCY = 4
+#Bulk drafts are saved in batches of this many, or whatever is ready after this many seconds
+BULK_SAVE_BATCH = 25
+BULK_SAVE_SECONDS = 2.0
+#Days from the first outreach to its follow-up, and how far a snooze pushes the follow-up back
+FOLLOWUP_INTERVAL_DAYS = int(os.getenv("FOLLOWUP_INTERVAL_DAYS", "7"))
+SNOOZE_DAYS = int(os.getenv("SNOOZE_DAYS", "3"))
+
+def followup_prompt(name, title, company):
+    return followup_messages(name, title, company)
+
+def generate_followup_message(name, title, company, refresh_cache=False):
+    try:
+        return chat_completion(followup_prompt(name, title, company), refresh_cache=refresh_cache, purpose="followup")
+    except Exception as e:
+        return f"Error generating follow-up: {e}"
+
+def stream_followup_message(name, title, company, refresh_cache=False, cancel=None):
+    #Yields the draft piece by piece; errors are raised so a partial draft is never mistaken for a finished one
+    return stream_chat_completion(followup_prompt(name, title, company), refresh_cache=refresh_cache, cancel=cancel,
+                                  purpose="followup")
+
+def due_leads(df, today=None, missing_only=True):
+    """
+    Leads whose follow-up date has arrived; by default only the ones without a draft yet.
+    """
+    import pandas as pd
+    #compared as Timestamps: .dt.date against a date raises on pandas 3 when every date is missing
+    today = pd.Timestamp(today or datetime.now().date())
+    due = df[df["next_followup_date"].notna() & (df["next_followup_date"] <= today)]
+    if missing_only:
+        due = due[due["followup_message"].fillna("").str.strip() == ""]
+    return due
+
+class BulkFollowupJob:
+    """
+    Generates follow-ups for many leads on a background thread pool.
+    Finished drafts are saved a batch at a time (one store write and one new snapshot per batch),
+    so stopping early keeps everything saved so far. A lead whose follow-up changed while its draft
+    was generating, e.g. a rep wrote one, keeps the rep's version.
+    The Streamlit script only reads progress(); it never waits on the pool.
+    """
+    def __init__(self, leads, activity_log, rows, concurrency=BULK_CONCURRENCY, refresh_cache=False):
+        #rows are (lead_id, name, title, company, current follow-up message)
+        self.leads = leads
+        self.activity_log = activity_log
+        self.rows = list(rows)
+        self.concurrency = concurrency
+        self.refresh_cache = refresh_cache
+        self.done = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = []
+        self._last_save = time.time()
+        self._save_lock = threading.Lock()
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="bulk-followups", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _generate(self, row):
+        if self._cancelled.is_set():
+            return
+        lead_id, name, title, company, _ = row
+        followup = generate_followup_message(name, title, company, refresh_cache=self.refresh_cache)
+        failed = followup.startswith("Error generating follow-up")
+        with self._lock:
+            self.done += 1
+            self.failed += int(failed)
+            if not failed:
+                self._pending.append((row, followup))
+            batch_ready = len(self._pending) >= BULK_SAVE_BATCH or time.time() - self._last_save >= BULK_SAVE_SECONDS
+        if batch_ready:
+            self._save()
+
+    def _save(self):
+        with self._save_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._last_save = time.time()
+            if not pending:
+                return
+            try:
+                saved = set(self.leads.save_followup_drafts(
+                    {row[0]: followup for row, followup in pending},
+                    {row[0]: row[4] for row, _ in pending}
+                ))
+            except Exception as e:
+                print(f"Saving {len(pending)} bulk follow-ups failed: {e}")
+                with self._lock:
+                    self.failed += len(pending)
+                return
+            for (lead_id, name, title, company, _), _ in pending:
+                if lead_id in saved:
+                    self.activity_log.append("followup_generated", int(lead_id), name, title, company, bulk=True)
+
+    def _run(self):
+        try:
+            with get_metrics().stage("bulk_followups"), ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                list(pool.map(self._generate, self.rows))
+        finally:
+            self._save()
+            self.finished_at = time.time()
+            get_metrics().increment("bulk_followups_generated", self.done - self.failed)
+            get_metrics().write()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def progress(self):
+        with self._lock:
+            return {
+                "total": len(self.rows),
+                "done": self.done,
+                "failed": self.failed,
+                "running": self.running,
+                "cancelled": self._cancelled.is_set(),
+                "elapsed": (self.finished_at or time.time()) - (self.started_at or time.time())
+            }
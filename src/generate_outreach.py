@@ -1,79 +1,215 @@
-import csv
+import json
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def generate_message(name, title, company, outreach_method, event=None, rationale=None):
-    base_intro = f"{name} is the {title} at {company}."
-    if event:
-        base_intro += f" They are attending {event}."
-    if rationale:
-        base_intro += f" {company} was selected because \"{rationale}\"."    
-
-    if outreach_method == "email":
-        prompt = f"""
-        Write a short but very personalized cold outreach email to {name}, the {title} at {company}.
-        {base_intro}
-        You are introduing a solution/product built on DuPont Tedlar, high durability protective films for signage, vehicle wraps and commercial graphics. 
-        Make it relevant to their role and industry, and end with something encouraging them to connect such as "Would love to connect if this is relevant to your team." or something similar.
-        """
-    else:
-        prompt = f"""
-        Write a short, casual LinkedIn message to {name}, the {title} at {company}.
-        {base_intro}
-        Mention that you are reaching out about high performance protective films for signage, a commercial graphics, built with DuPont Tedlar. 
-        Make the message conversational and light, like an actual direct message, with a low pressure encouragement to connect. 
-        """
+from src.llm import RateLimiter, cache_stats, chat_completion, echo_stream, stream_chat_completion
+from src.manifest import RowCheckpoint, fingerprint_value
+from src.metrics import get_metrics
+from src.prompts import PROMPT_VERSION, batch_outreach_messages, outreach_messages
+from src.streaming import chunked, iter_csv, map_in_order, write_csv
+
+#Row fields that change the generated message; a row is regenerated only if one of these changes
+MESSAGE_INPUT_FIELDS = ["name", "title", "company", "outreach_method", "event", "rationale"]
+
+def generate_message(name, title, company, outreach_method, event=None, rationale=None, rate_limiter=None,
+                     use_cache=True, refresh_cache=False, show_tokens=False):
+    #Static instructions first, then the company, then the contact, so consecutive requests share a prefix
+    prompt = outreach_messages(name, title, company, outreach_method, event, rationale)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role":"user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
+        if show_tokens:
+            #prints the message to the terminal as it is written
+            return echo_stream(stream_chat_completion(prompt, rate_limiter=rate_limiter, use_cache=use_cache,
+                                                      refresh_cache=refresh_cache, purpose="outreach"))
+        return chat_completion(prompt, rate_limiter=rate_limiter, use_cache=use_cache, refresh_cache=refresh_cache, purpose="outreach")
     except Exception as e:
         print(f"Error generating message for {name}: {e}")
         return ""
 
-def process_messages(input_file="data/contacts_with_emails.csv", output_file="data/contacts_with_messages.csv"):
-    contacts = []
+def generate_row_message(row, rate_limiter=None, use_cache=True, refresh_cache=False, show_tokens=False):
+    name = row["name"]
+    company = row["company"]
+    outreach_method = row["outreach_method"]
+    print(f"Generating message for {name} at {company} via {outreach_method}...")
+    return generate_message(
+        name, row["title"], company, outreach_method,
+        row.get("event", ""), row.get("rationale", ""),
+        rate_limiter=rate_limiter,
+        use_cache=use_cache,
+        refresh_cache=refresh_cache,
+        show_tokens=show_tokens
+    )
 
-    if not os.path.exists(input_file):
-        print(f"Input file not found: {input_file}")
-        return
+def build_batch_prompt(batch, outreach_method):
+    #The Tedlar instructions are sent once per batch instead of once per contact, and each company once
+    return batch_outreach_messages(batch, outreach_method)
+
+def parse_batch_response(text, expected_ids):
+    """
+    Returns {contact id: message} for every well formed item in the model's JSON array.
+    Unknown ids, duplicates and empty messages are dropped so the caller can fall back for them.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        #models sometimes wrap JSON in a markdown code fence
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    messages = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        contact_id = str(item.get("id", ""))
+        message = item.get("message")
+        if contact_id in expected_ids and contact_id not in messages and isinstance(message, str) and message.strip():
+            messages[contact_id] = message.strip()
+    return messages
+
+def generate_messages_batch(batch, outreach_method, rate_limiter=None, use_cache=True, refresh_cache=False):
+    """
+    Generates messages for a list of (contact id, row) pairs with a single request.
+    Any contact missing from, or malformed in, the response gets its own generate_message call.
+    """
+    print(f"Generating {len(batch)} {outreach_method} messages in one batch...")
+    expected_ids = {str(contact_id) for contact_id, _ in batch}
+    try:
+        response = chat_completion(
+            build_batch_prompt(batch, outreach_method),
+            rate_limiter=rate_limiter,
+            expected_completion_tokens=300 * len(batch),
+            use_cache=use_cache,
+            refresh_cache=refresh_cache,
+            purpose="outreach_batch"
+        )
+        messages = parse_batch_response(response, expected_ids)
+    except Exception as e:
+        print(f"Error generating batch of {len(batch)} messages: {e}")
+        messages = {}
+
+    results = {}
+    for contact_id, row in batch:
+        message = messages.get(str(contact_id))
+        if message is None:
+            print(f"Batch response missing {row['name']}, falling back to a single request...")
+            get_metrics().increment("batch_fallbacks")
+            message = generate_row_message(row, rate_limiter, use_cache, refresh_cache)
+        results[contact_id] = message
+    return results
 
-    with open(input_file, newline="") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            name = row["name"]
-            title = row["title"]
-            company = row["company"]
-            outreach_method = row["outreach_method"]
-            event = row.get("event", "")
-            rationale = row.get("rationale", "")
+def make_batches(indexed_contacts, batch_size):
+    #Only contacts with the same outreach method can share instructions
+    batches = []
+    pending = {}
+    for idx, row in indexed_contacts:
+        method = row["outreach_method"]
+        pending.setdefault(method, []).append((idx, row))
+        if len(pending[method]) == batch_size:
+            batches.append((method, pending.pop(method)))
+    batches.extend(pending.items())
+    return batches
 
-            print(f"Generating message for {name} at {company} via {outreach_method}...")
+def row_fingerprint(row):
+    return fingerprint_value([PROMPT_VERSION, *(row.get(field, "") for field in MESSAGE_INPUT_FIELDS)])
 
-            message = generate_message(name, title, company, outreach_method, event, rationale)
+def iter_messages(contacts, concurrency=1, rate_limiter=None, use_cache=True, refresh_cache=False,
+                  batch_size=1, checkpoint=None, show_tokens=False):
+    """
+    Generator version of the message stage: takes contact rows (any iterable) and yields them
+    in the same order with outreach_message and the follow-up columns filled in.
+    Only a few chunks of rows are held in memory at a time.
+    show_tokens prints each message as it streams in; it only applies to one-at-a-time,
+    unbatched runs, where the output wouldn't interleave.
+    """
+    show_tokens = show_tokens and concurrency == 1 and batch_size <= 1
+
+    def process_chunk(chunk):
+        pending = []
+        for row in chunk:
+            saved = None
+            if checkpoint is not None and not refresh_cache:
+                saved = checkpoint.get(row_fingerprint(row))
+            if saved is not None:
+                row["outreach_message"] = saved
+            else:
+                pending.append(row)
+
+        def save(row, message):
             row["outreach_message"] = message
+            get_metrics().increment("messages_generated" if message else "messages_failed")
+            #failed generations come back empty and are retried on the next run
+            if message and checkpoint is not None:
+                checkpoint.add(row_fingerprint(row), message)
+
+        if batch_size > 1:
+            for method, batch in make_batches(enumerate(pending), batch_size):
+                for idx, message in generate_messages_batch(batch, method, rate_limiter, use_cache, refresh_cache).items():
+                    save(pending[idx], message)
+        else:
+            for row in pending:
+                save(row, generate_row_message(row, rate_limiter, use_cache, refresh_cache, show_tokens))
+
+        for row in chunk:
             row["last_outreach_date"] = ""
             row["next_followup_date"] = ""
             row["followup_status"] = ""
             row["followup_message"] = ""
+        return chunk
+
+    #Chunks are returned in input order, so the output keeps the original row order
+    for chunk in map_in_order(process_chunk, chunked(contacts, max(batch_size, 1)), concurrency):
+        yield from chunk
+
+def process_messages(input_file="data/contacts_with_emails.csv", output_file="data/contacts_with_messages.csv",
+                     concurrency=1, requests_per_minute=None, tokens_per_minute=None,
+                     use_cache=True, refresh_cache=False, batch_size=1, resume=True, show_tokens=False):
+    if not os.path.exists(input_file):
+        print(f"Input file not found: {input_file}")
+        return
+
+    rate_limiter = None
+    if requests_per_minute or tokens_per_minute:
+        rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+    #Every finished message is checkpointed right away, so a crash only loses the rows in flight
+    checkpoint = RowCheckpoint(output_file + ".checkpoint.jsonl") if resume else None
+    row_keys = set()
 
-            contacts.append(row)
+    def track(rows):
+        for row in rows:
+            row_keys.add(row_fingerprint(row))
+            yield row
+
+    rows = iter_messages(
+        track(iter_csv(input_file)),
+        concurrency=concurrency,
+        rate_limiter=rate_limiter,
+        use_cache=use_cache,
+        refresh_cache=refresh_cache,
+        batch_size=batch_size,
+        checkpoint=checkpoint,
+        show_tokens=show_tokens
+    )
+    count = write_csv(rows, output_file)
+
+    if not count:
+        print(f"No contacts found in {input_file}")
+        return
 
-    os.makedirs("data", exist_ok=True)
-    with open(output_file, mode="w", newline="") as csvfile:
-        fieldnames = contacts[0].keys()
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(contacts)
+    if checkpoint is not None:
+        get_metrics().increment("checkpoint_hits", checkpoint.hits)
+        if checkpoint.hits:
+            print(f"Reused {checkpoint.hits} checkpointed messages.")
+        checkpoint.compact(row_keys)
 
-    print(f"Generated messages for {len(contacts)} contacts -> {output_file}")
+    print(f"Generated messages for {count} contacts -> {output_file}")
+    stats = cache_stats()
+    if stats["hits"] or stats["misses"]:
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
 
 if __name__ == "__main__":
     process_messages()
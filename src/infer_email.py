@@ -1,8 +1,179 @@
-import csv
 import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from src.streaming import chunked, iter_csv, write_csv
 
 #We can set this to True later when we are ready to search google for the email formats
-ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP = False
+ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP = os.getenv("ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP", "").lower() in ("1", "true", "yes")
+LOOKUP_CHUNK_SIZE = 500
+
+#Known addresses (columns: name, email) that the offline engine learns each domain's format from
+KNOWN_EMAILS_PATH = "data/known_emails.csv"
+
+#Only switch a contact to email when the domain's format is this well supported
+MIN_FORMAT_CONFIDENCE = 0.6
+MIN_FORMAT_EXAMPLES = 2
+
+#Each builder takes (first, last, first initial, last initial) and works on plain strings
+#as well as pandas Series, so the same table drives both inference and corpus learning
+EMAIL_FORMATS = {
+    "first.last": lambda first, last, f, l: first + "." + last,
+    "firstlast": lambda first, last, f, l: first + last,
+    "first_last": lambda first, last, f, l: first + "_" + last,
+    "first-last": lambda first, last, f, l: first + "-" + last,
+    "flast": lambda first, last, f, l: f + last,
+    "f.last": lambda first, last, f, l: f + "." + last,
+    "firstl": lambda first, last, f, l: first + l,
+    "first.l": lambda first, last, f, l: first + "." + l,
+    "last.first": lambda first, last, f, l: last + "." + first,
+    "lastfirst": lambda first, last, f, l: last + first,
+    "lastf": lambda first, last, f, l: last + f,
+    "first": lambda first, last, f, l: first,
+    "last": lambda first, last, f, l: last
+}
+#Formats that use the last name or its initial; a one-word name can't fill these in
+FORMATS_NEEDING_LAST = {"first.last", "firstlast", "first_last", "first-last", "flast", "f.last",
+                        "firstl", "first.l", "last.first", "lastfirst", "lastf", "last"}
+
+NAME_TITLES = r"^(dr|mr|mrs|ms|miss|prof|sir|rev)\.?\s+"
+NAME_SUFFIXES = r",?\s+(jr|sr|ii|iii|iv|phd|md|mba|cpa|esq)\.?$"
+
+def normalize_names(names):
+    """
+    Vectorized name cleanup for a pandas Series of full names.
+    Returns a DataFrame with ascii, lowercase "first" and "last" columns (titles, suffixes and accents removed).
+    """
+    import pandas as pd
+    cleaned = (
+        names.fillna("").astype(str)
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.lower().str.strip()
+        .str.replace(NAME_TITLES, "", regex=True)
+        .str.replace(NAME_SUFFIXES, "", regex=True)
+        .str.replace(r"[^a-z\s-]", "", regex=True)
+        .str.split()
+    )
+    return pd.DataFrame({
+        "first": cleaned.str[0].fillna("").str.replace("-", "", regex=False),
+        "last": cleaned.str[-1].where(cleaned.str.len() > 1, "").fillna("").str.replace("-", "", regex=False)
+    }, index=names.index)
+
+@lru_cache(maxsize=100000)
+def normalize_name(name):
+    #Single-name version of normalize_names for the row by row path
+    name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii").lower().strip()
+    name = re.sub(NAME_SUFFIXES, "", re.sub(NAME_TITLES, "", name))
+    parts = re.sub(r"[^a-z\s-]", "", name).split()
+    if not parts:
+        return "", ""
+    last = parts[-1] if len(parts) > 1 else ""
+    return parts[0].replace("-", ""), last.replace("-", "")
+
+def infer_email(name, domain, email_format):
+    first, last = normalize_name(name)
+    if not first or (not last and email_format in FORMATS_NEEDING_LAST) or email_format not in EMAIL_FORMATS:
+        return ""
+    return f"{EMAIL_FORMATS[email_format](first, last, first[:1], last[:1])}@{domain}"
+
+class EmailFormatEngine:
+    """
+    Learns the dominant email format per domain from a corpus of known addresses.
+    Learning happens once, vectorized over the whole corpus; lookups are cached per domain,
+    so a big contact run only does pattern work once for each company domain.
+    """
+    def __init__(self, corpus_path=KNOWN_EMAILS_PATH):
+        self.corpus_path = corpus_path
+        self.domain_scores = None
+        self._domain_cache = {}
+        self._lock = threading.Lock()
+
+    def learn(self, corpus=None):
+        """
+        corpus is a DataFrame with name and email columns; defaults to reading corpus_path.
+        """
+        import pandas as pd
+        if corpus is None:
+            if not os.path.exists(self.corpus_path):
+                self.domain_scores = {}
+                return self.domain_scores
+            corpus = pd.read_csv(self.corpus_path, dtype=str)
+
+        emails = corpus["email"].fillna("").str.strip().str.lower()
+        parts = emails.str.extract(r"^([^@\s]+)@([^@\s]+)$")
+        names = normalize_names(corpus["name"])
+        #single-word names would make most formats look alike, so they don't count as evidence
+        valid = parts[0].notna() & (names["first"] != "") & (names["last"] != "")
+        local, domains = parts.loc[valid, 0], parts.loc[valid, 1]
+        first, last = names.loc[valid, "first"], names.loc[valid, "last"]
+
+        first_initial, last_initial = first.str[:1], last.str[:1]
+        candidates = {fmt: build(first, last, first_initial, last_initial) for fmt, build in EMAIL_FORMATS.items()}
+        matches = pd.DataFrame({fmt: (local == generated) & (generated != "") for fmt, generated in candidates.items()})
+        matches["domain"] = domains
+        format_counts = matches.groupby("domain").sum()
+        examples = domains.value_counts()
+
+        self.domain_scores = {}
+        for domain, counts in format_counts.iterrows():
+            total = int(examples[domain])
+            #confidence is the share of the domain's examples that fit the format
+            self.domain_scores[domain] = {
+                "examples": total,
+                "scores": {fmt: int(count) / total for fmt, count in counts.items() if count}
+            }
+        self._domain_cache = {}
+        return self.domain_scores
+
+    def candidates(self, domain):
+        """
+        Returns [(format, confidence), ...] best first for the domain, falling back to parent domains
+        (graphics.averydennison.com -> averydennison.com).
+        """
+        if not domain:
+            return []
+        with self._lock:
+            if domain in self._domain_cache:
+                return self._domain_cache[domain]
+            if self.domain_scores is None:
+                self.learn()
+
+            result = []
+            labels = domain.lower().split(".")
+            for i in range(len(labels) - 1):
+                entry = self.domain_scores.get(".".join(labels[i:]))
+                if entry:
+                    result = sorted(entry["scores"].items(), key=lambda item: item[1], reverse=True)
+                    if entry["examples"] < MIN_FORMAT_EXAMPLES:
+                        result = [(fmt, score * entry["examples"] / MIN_FORMAT_EXAMPLES) for fmt, score in result]
+                    break
+            self._domain_cache[domain] = result
+            return result
+
+    def email_domain(self, domain):
+        #the domain the corpus actually knows addresses for, which may be a parent of the website's
+        labels = (domain or "").lower().split(".")
+        for i in range(len(labels) - 1):
+            candidate = ".".join(labels[i:])
+            if self.domain_scores and candidate in self.domain_scores:
+                return candidate
+        return domain
+
+    def best_format(self, domain):
+        candidates = self.candidates(domain)
+        if candidates and candidates[0][1] >= MIN_FORMAT_CONFIDENCE:
+            return candidates[0]
+        return None, 0.0
+
+_engine = None
+
+def get_format_engine():
+    global _engine
+    if _engine is None:
+        _engine = EmailFormatEngine()
+    return _engine
 
 def get_domain_from_url(url):
     try:
@@ -11,56 +182,90 @@ def get_domain_from_url(url):
     except:
         return None
 
-#Placeholder for future email lookup
+_online_lookup = None
+
+def get_online_lookup():
+    #Imported lazily so httpx and BeautifulSoup are only needed when online lookup is turned on
+    global _online_lookup
+    if _online_lookup is None:
+        from src.email_lookup import EmailFormatLookup
+        _online_lookup = EmailFormatLookup(EMAIL_FORMATS.keys())
+    return _online_lookup
+
 def lookup_email_format_online(company_name, domain):
     """
-    Future implementation:
-    If ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP is True:
-    - Will search google with 
-        "[{company name}] email format, site: rocketreach.com or hunter.io or signalhire.com or leadiq.com (which is my favorite because is free!)
-    - Use tools like SerpAPI, BeautifulSoup, or scraping
-    - Extract example email format that are most common (i.e. john.doe@company.com)
-    - Use tools to identify common formats and return the format string (i.e. 'first.last')
-
-    As of now will return nothing, but is a great opportunity for future enhancement!
+    Searches the web for "<company> email format" (see src/email_lookup.py) and returns a format
+    string such as 'first.last', or None. Results are cached on disk per domain.
     """
-    return None
+    if not domain:
+        return None
+    return get_online_lookup().lookup(company_name, domain)
+
+def prefetch_email_formats(rows):
+    #Resolve every domain in this chunk that the offline engine can't answer, in one concurrent batch
+    engine = get_format_engine()
+    pending = {}
+    for row in rows:
+        domain = get_domain_from_url(row["company_website"])
+        if domain and domain not in pending and not engine.best_format(domain)[0]:
+            pending[domain] = row["company"]
+    if pending:
+        get_online_lookup().lookup_many(pending)
 
 #Will include some foundation for when we add the google email lookup
+def enrich_contact(row):
+    website = row["company_website"]
+    company = row["company"]
+    domain = get_domain_from_url(website)
+
+    #default to LinkedIn unless we can work out the email format
+    row["email"] = ""
+    row["email_format"] = ""
+    row["email_confidence"] = ""
+    row["outreach_method"] = "linkedin"
+
+    engine = get_format_engine()
+    format_found, confidence = engine.best_format(domain)
+    email_domain = engine.email_domain(domain)
+
+    #for the future when we try finding the real email format via google search
+    if not format_found and ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP:
+        format_found = lookup_email_format_online(company, domain)
+        confidence = 1.0 if format_found else 0.0
+        email_domain = domain
+
+    if format_found:
+        email = infer_email(row["name"], email_domain, format_found)
+        if email:
+            row["email"] = email
+            row["email_format"] = format_found
+            row["email_confidence"] = f"{confidence:.2f}"
+            row["outreach_method"] = "email"
+
+    return row
+
+def iter_enriched_contacts(contacts):
+    if not ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP:
+        for row in contacts:
+            yield enrich_contact(row)
+        return
+
+    #With online lookup on, rows are handled in chunks so each chunk's domains are fetched together
+    for chunk in chunked(contacts, LOOKUP_CHUNK_SIZE):
+        prefetch_email_formats(chunk)
+        for row in chunk:
+            yield enrich_contact(row)
+
 def process_contacts(input_file="data/contacts.csv", output_file="data/contacts_with_emails.csv"):
-    contacts = []
-
-    with open(input_file, newline="") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            website = row["company_website"]
-            company = row["company"]
-            domain = get_domain_from_url(website)
-
-            #default to LinkedIn for now
-            row["email"] = ""
-            row["email_format"] = ""
-            row["outreach_method"] = "linkedin"
-
-            #for the future when we try finding the real email format via google search
-            if ENABLE_GOOGLE_EMAIL_FORMAT_LOOKUP:
-                format_found = lookup_email_format_online(company, domain)
-                if format_found:
-                    #would be something like this:
-                    #row["email"] = infer_email(name, domain, format_found)
-                    #row["email_format"] = format_found
-                    #row["outreach_method"] = "email"
-                    pass
-
-            contacts.append(row)
-
-    os.makedirs("data", exist_ok=True)
-    with open(output_file, mode="w", newline="") as csvfile:
-        fieldnames = contacts[0].keys()
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(contacts)
-    print(f"Processed {len(contacts)} contacts -> {output_file} (LinkedIn outreach only)")
+    methods = Counter()
+
+    def count_methods(rows):
+        for row in rows:
+            methods[row["outreach_method"]] += 1
+            yield row
+
+    count = write_csv(count_methods(iter_enriched_contacts(iter_csv(input_file))), output_file)
+    print(f"Processed {count} contacts -> {output_file} ({methods['email']} email, {methods['linkedin']} LinkedIn)")
 
 if __name__ == "__main__":
     process_contacts()
@@ -0,0 +1,266 @@
+"""
+Ingests exhibitor lists (CSV, JSONL, or saved HTML pages) into data/events_companies.csv:
+
+    python main.py ingest exports/fespa_exhibitors.csv --event FESPA
+    python -m src.ingest_events saved_pages/*.html --event "Printing United"
+
+Files are read row by row and written in chunks, so memory stays flat however long the list is.
+Companies are deduplicated across files and events on a hash of their website's registered domain
+and of their normalized name, and only new ones are appended, so the same export can be ingested twice.
+The built-in list (src/extract_events.py) is the exception: the events stage replaces its rows,
+so edits to it reach the file.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    #Windows: no advisory locks, so concurrent appends there are on the caller
+    fcntl = None
+from src.company_index import normalize_company, registered_domain
+from src.streaming import chunked
+
+EVENTS_FILE = "data/events_companies.csv"
+EVENT_FIELDS = ["event", "company", "industry", "website", "rationale", "source"]
+#source of rows from the built-in list; ingested rows carry the name of the file they came from
+BUILTIN_SOURCE = "built-in"
+CHUNK_SIZE = 1000
+#Exhibitors sometimes list a social profile instead of a website; those domains say nothing about the company
+SHARED_DOMAINS = {"linkedin.com", "facebook.com", "instagram.com", "twitter.com", "x.com", "youtube.com", "google.com", "wixsite.com"}
+
+#Column names seen in exhibitor exports, mapped onto EVENT_FIELDS (source is set by iter_exhibitors)
+FIELD_ALIASES = {
+    "company": ["company", "company name", "exhibitor", "exhibitor name", "name", "organization", "organisation"],
+    "website": ["website", "web", "url", "homepage", "site", "web address"],
+    "industry": ["industry", "category", "categories", "sector", "product category"],
+    "event": ["event", "show", "trade show"],
+    "rationale": ["rationale", "description", "about"]
+}
+
+def map_fields(record, event=""):
+    #Returns an EVENT_FIELDS row without its source, or None if the record has no company name
+    keys = {str(key).strip().lower(): key for key in record}
+    row = {}
+    for field, aliases in FIELD_ALIASES.items():
+        key = next((keys[alias] for alias in aliases if alias in keys), None)
+        value = record[key] if key is not None else ""
+        row[field] = " ".join(str(value or "").split())
+    row["event"] = row["event"] or event
+    website = row["website"]
+    if website and "//" not in website:
+        row["website"] = f"https://{website}"
+    return row if row["company"] else None
+
+def iter_csv_records(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+def iter_jsonl_records(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+def iter_html_records(path):
+    """
+    Exhibitor pages are usually a table with a header row, or a list of cards with the company's
+    name and a link to its site. One saved page is parsed at a time, so paginated lists stay bounded.
+    """
+    #Imported here, like the email lookup, so bs4 is only needed for HTML exports
+    from bs4 import BeautifulSoup
+    with open(path, encoding="utf-8", errors="replace") as f:
+        soup = BeautifulSoup(f, "html.parser")
+
+    def external_link(element):
+        return element.find("a", href=lambda href: href and href.startswith("http"))
+
+    found = False
+    for table in soup.find_all("table"):
+        rows = table.find_all("tr")
+        if not rows:
+            continue
+        header = [cell.get_text(" ", strip=True) for cell in rows[0].find_all(["th", "td"])]
+        has_website_column = any(name.lower() in FIELD_ALIASES["website"] for name in header)
+        for tr in rows[1:]:
+            record = {name: cell.get_text(" ", strip=True) for name, cell in zip(header, tr.find_all(["td", "th"]))}
+            link = external_link(tr)
+            if link and not has_website_column:
+                record["website"] = link["href"]
+            found = True
+            yield record
+    if found:
+        return
+
+    for card in soup.find_all(class_=lambda value: value and "exhibitor" in value.lower()):
+        name = card.find(["h2", "h3", "h4", "strong", "a"])
+        link = external_link(card)
+        if name:
+            yield {"company": name.get_text(" ", strip=True), "website": link["href"] if link else ""}
+
+READERS = {".csv": iter_csv_records, ".jsonl": iter_jsonl_records, ".html": iter_html_records, ".htm": iter_html_records}
+
+def check_paths(paths):
+    #Up front, so a typo in the last file doesn't stop the ingest halfway through
+    for path in paths:
+        if os.path.splitext(path)[1].lower() not in READERS:
+            raise ValueError(f"Don't know how to read {path} (expected one of {', '.join(READERS)})")
+        if not os.path.exists(path):
+            raise ValueError(f"File not found: {path}")
+
+def iter_exhibitors(paths, event=""):
+    for path in paths:
+        for record in READERS[os.path.splitext(path)[1].lower()](path):
+            row = map_fields(record, event)
+            if row is not None:
+                row["source"] = os.path.basename(path)
+                yield row
+
+def dedupe_keys(row):
+    #8 byte digests keep the seen set small; the domain alone already identifies most companies
+    keys = []
+    domain = registered_domain(row.get("website", ""))
+    if domain and domain not in SHARED_DOMAINS:
+        keys.append(hashlib.blake2b(f"d:{domain}".encode(), digest_size=8).digest())
+    name = normalize_company(row.get("company", ""))
+    if name:
+        keys.append(hashlib.blake2b(f"n:{name}".encode(), digest_size=8).digest())
+    return keys
+
+def seen_keys(filename=EVENTS_FILE):
+    #Only the keys of what's already ingested are held in memory, not the rows
+    seen = set()
+    if os.path.exists(filename) and os.path.getsize(filename):
+        with open(filename, newline="") as f:
+            for row in csv.DictReader(f):
+                seen.update(dedupe_keys(row))
+    return seen
+
+@contextmanager
+def locked(filename):
+    #Held while the events file is read and written, so parallel runs (e.g. shards sharing a data
+    #directory) take turns. It is a separate file because replace_builtin_events swaps the file itself
+    with open(filename + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+def file_fields(filename):
+    #The header of an existing file, which rows appended to it have to follow; None for a new file
+    if not os.path.exists(filename) or not os.path.getsize(filename):
+        return None
+    with open(filename, newline="") as f:
+        return next(csv.reader(f), None) or EVENT_FIELDS
+
+def unique_events(rows):
+    #In memory version of append_events' dedupe, for reading events without writing them anywhere
+    seen = set()
+    for row in rows:
+        keys = dedupe_keys(row)
+        if any(key in seen for key in keys):
+            continue
+        seen.update(keys)
+        yield row
+
+def append_events(rows, filename=EVENTS_FILE, chunk_size=CHUNK_SIZE):
+    """
+    Appends the rows whose company isn't in filename yet; returns (appended, duplicates).
+    A row counts as a duplicate if its domain or its normalized name was seen before.
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    appended = duplicates = 0
+    with locked(filename), open(filename, mode="a", newline="") as f:
+        seen = seen_keys(filename)
+        fields = file_fields(filename)
+        writer = csv.DictWriter(f, fieldnames=fields or EVENT_FIELDS, extrasaction="ignore")
+        if fields is None:
+            writer.writeheader()
+        for chunk in chunked(rows, chunk_size):
+            fresh = []
+            for row in chunk:
+                keys = dedupe_keys(row)
+                if any(key in seen for key in keys):
+                    duplicates += 1
+                    continue
+                seen.update(keys)
+                fresh.append(row)
+            writer.writerows(fresh)
+            f.flush()
+            appended += len(fresh)
+    return appended, duplicates
+
+def is_ingested(row, builtin_keys):
+    #Files from before the source column have no way to tell, so their rows for built-in companies count as built-in
+    if row.get("source") == BUILTIN_SOURCE:
+        return False
+    return not any(key in builtin_keys for key in dedupe_keys(row))
+
+def iter_events(builtin, filename=EVENTS_FILE):
+    """
+    The built-in rows followed by what was ingested into filename, without writing anything.
+    Built-in rows win over older copies of themselves in the file.
+    """
+    builtin = [dict(row, source=BUILTIN_SOURCE) for row in unique_events(builtin)]
+    builtin_keys = {key for row in builtin for key in dedupe_keys(row)}
+    yield from builtin
+    if os.path.exists(filename) and os.path.getsize(filename):
+        with open(filename, newline="") as f:
+            yield from unique_events(row for row in csv.DictReader(f) if is_ingested(row, builtin_keys))
+
+def replace_builtin_events(builtin, filename=EVENTS_FILE, chunk_size=CHUNK_SIZE):
+    """
+    Rewrites filename with the built-in rows in place of the ones written before, so changed
+    rationales, industries or events take effect and removed companies go away. Ingested rows are
+    kept as they are. Returns (built-in rows written, ingested rows kept).
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    written = kept = 0
+    tmp_path = filename + ".tmp"
+    with locked(filename):
+        with open(tmp_path, mode="w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=EVENT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for chunk in chunked(iter_events(builtin, filename), chunk_size):
+                writer.writerows(chunk)
+                builtin_rows = sum(row.get("source") == BUILTIN_SOURCE for row in chunk)
+                written += builtin_rows
+                kept += len(chunk) - builtin_rows
+        os.replace(tmp_path, filename)
+    return written, kept
+
+def ingest_command(paths, event="", output_file=EVENTS_FILE):
+    check_paths(paths)
+    appended, duplicates = append_events(iter_exhibitors(paths, event), output_file)
+    print(f"Ingested {appended} new companies from {len(paths)} file(s) -> {output_file} ({duplicates} duplicates skipped)")
+    return appended
+
+def add_ingest_arguments(parser):
+    parser.add_argument("files", nargs="+", help="Exhibitor exports: .csv, .jsonl or saved .html pages")
+    parser.add_argument("--event", default="", help="Event name for rows that don't carry one")
+    parser.add_argument("--output", default=EVENTS_FILE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append exhibitor lists to the events/companies CSV")
+    add_ingest_arguments(parser)
+    args = parser.parse_args()
+    try:
+        ingest_command(args.files, args.event, args.output)
+    except ValueError as e:
+        parser.error(str(e))
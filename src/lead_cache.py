@@ -0,0 +1,104 @@
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from src.analytics import ALL_COMPANIES, LeadAggregates
+
+DATE_COLUMNS = ["last_outreach_date", "next_followup_date"]
+
+def parse_dates(df):
+    for column in DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column], errors="coerce")
+    return df
+
+def filter_positions(df, company=ALL_COMPANIES, matches=None, outreach_filter="All", followup_filter="All", today=None):
+    """
+    The dashboard's sidebar filters, as an array of row positions into df. matches is an optional
+    collection of lead ids from search. Nothing is copied: callers take just the rows they show,
+    e.g. df.iloc[positions[start:stop]].
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if company is not ALL_COMPANIES:
+        mask &= (df["company"] == company).to_numpy()
+
+    if matches is not None:
+        mask &= df.index.isin(matches)
+
+    if outreach_filter != "All":
+        sent_mask = df["last_outreach_date"].notna().to_numpy()
+        mask &= sent_mask if outreach_filter == "Sent" else ~sent_mask
+
+    if followup_filter != "All":
+        today = pd.Timestamp(today or datetime.now().date())
+        followup_dates = df["next_followup_date"]
+        mask &= (followup_dates <= today if followup_filter == "Due" else followup_dates > today).to_numpy()
+    return np.flatnonzero(mask)
+
+class CachedLeadFrame:
+    """
+    One parsed leads DataFrame per process, shared by every Streamlit rerun and session.
+    Each frame get() returns is a snapshot that is never modified: update() publishes a new frame
+    that shares every column except the ones it changed, so a session can keep reading the snapshot
+    it started with while others write. It is reloaded only when the store's version changes under it.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.df = None
+        self.aggregates = None
+        self.version = None
+        #bumped on every full reload; things derived from the rows (like the search index) key on it
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = self.store.version()
+        with self._lock:
+            if self.df is None or version != self.version:
+                self.df = parse_dates(self.store.read_dataframe())
+                self.aggregates = LeadAggregates(self.df)
+                self.version = version
+                self.generation += 1
+            return self.df
+
+    def update(self, lead_id, **fields):
+        with self._lock:
+            new_version = self.store.update_lead(lead_id, **fields)
+            #If anyone else wrote in between, our copy is stale anyway and get() will reload it
+            if self.df is not None and self.version == new_version - 1:
+                df = self.df.copy(deep=False)
+                for field, value in fields.items():
+                    if field in DATE_COLUMNS:
+                        value = pd.to_datetime(value, errors="coerce")
+                    #copy only the changed column; the old snapshot keeps its own
+                    column = df[field].copy()
+                    column.at[lead_id] = value
+                    df[field] = column
+                self.aggregates.apply_update(
+                    df.at[lead_id, "company"],
+                    self.df.at[lead_id, "last_outreach_date"], df.at[lead_id, "last_outreach_date"],
+                    self.df.at[lead_id, "next_followup_date"], df.at[lead_id, "next_followup_date"]
+                )
+                self.df = df
+                self.version = new_version
+
+    def save_followup_drafts(self, drafts, previous=None):
+        """
+        Many follow-up drafts in one store transaction and one new snapshot (see LeadStore.save_followup_drafts).
+        Returns the ids that were written.
+        """
+        with self._lock:
+            saved, new_version = self.store.save_followup_drafts(drafts, previous)
+            if saved and self.df is not None and self.version == new_version - 1:
+                df = self.df.copy(deep=False)
+                column = df["followup_message"].copy()
+                column.loc[saved] = [drafts[lead_id] for lead_id in saved]
+                df["followup_message"] = column
+                self.df = df
+                self.version = new_version
+            return saved
+
+    def counts(self, company=ALL_COMPANIES):
+        #Sidebar and chart numbers, straight from the maintained aggregates
+        self.get()
+        with self._lock:
+            return self.aggregates.counts(company)
@@ -0,0 +1,186 @@
+import argparse
+import csv
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from src.streaming import chunked
+
+STORE_PATH = os.getenv("LEAD_STORE_PATH", "data/leads.sqlite")
+UPSERT_CHUNK_SIZE = 500
+
+LEAD_COLUMNS = [
+    "name", "title", "linkedin_url", "company", "company_website", "event", "rationale",
+    "email", "email_format", "outreach_method", "outreach_message",
+    "last_outreach_date", "next_followup_date", "followup_status", "followup_message"
+]
+
+#Columns the dashboard owns; a pipeline rerun should not wipe a rep's progress
+DASHBOARD_COLUMNS = ["last_outreach_date", "next_followup_date", "followup_status", "followup_message"]
+
+class LeadStore:
+    """
+    SQLite backed lead table shared by the pipeline and the dashboard.
+    Every write is a small transaction on a single row, and bumps a version number readers can poll.
+    """
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = ", ".join(f"{column} TEXT DEFAULT ''" for column in LEAD_COLUMNS)
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS leads (
+                    id INTEGER PRIMARY KEY,
+                    {columns},
+                    updated_at REAL
+                )
+            """)
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_identity ON leads (linkedin_url, company)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_company ON leads (company)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_last_outreach ON leads (last_outreach_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_next_followup ON leads (next_followup_date)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+
+    @contextmanager
+    def connect(self):
+        #One short lived connection per operation keeps this safe across Streamlit's threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _bump_version(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def version(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def count(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def get_lead(self, lead_id):
+        with self.connect() as conn:
+            row = conn.execute("SELECT * FROM leads WHERE id = ?", (lead_id,)).fetchone()
+            return dict(row) if row else None
+
+    def scheduled_followups(self):
+        #(lead id, next follow-up date) for every lead that has one, earliest first, off the next_followup_date index
+        with self.connect() as conn:
+            for row in conn.execute("SELECT id, next_followup_date FROM leads WHERE next_followup_date != '' ORDER BY next_followup_date"):
+                yield row["id"], row["next_followup_date"]
+
+    def iter_leads(self):
+        with self.connect() as conn:
+            for row in conn.execute("SELECT * FROM leads ORDER BY id"):
+                yield dict(row)
+
+    def update_lead(self, lead_id, **fields):
+        #Returns the store version after the write
+        unknown = set(fields) - set(LEAD_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown lead fields: {', '.join(sorted(unknown))}")
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        values = ["" if value is None else str(value) for value in fields.values()]
+        with self.connect() as conn:
+            conn.execute(
+                f"UPDATE leads SET {assignments}, updated_at = ? WHERE id = ?",
+                values + [time.time(), lead_id]
+            )
+            self._bump_version(conn)
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def save_followup_drafts(self, drafts, previous=None):
+        """
+        Writes {lead id: follow-up message} in one transaction, but only to leads whose follow-up message
+        is still what it was when the draft was started ({lead id: message}, empty by default), so a draft
+        a rep wrote in the meantime is never overwritten.
+        Returns the ids that were written and the store version after the write.
+        """
+        previous = previous or {}
+        saved = []
+        with self.connect() as conn:
+            for lead_id, message in drafts.items():
+                cursor = conn.execute(
+                    "UPDATE leads SET followup_message = ?, updated_at = ? WHERE id = ? AND followup_message = ?",
+                    (message, time.time(), lead_id, previous.get(lead_id, ""))
+                )
+                if cursor.rowcount:
+                    saved.append(lead_id)
+            if saved:
+                self._bump_version(conn)
+            return saved, conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def upsert_leads(self, rows):
+        """
+        Inserts new leads and refreshes pipeline columns on existing ones, matched on (linkedin_url, company).
+        Dashboard columns on existing leads are only overwritten with non-empty values.
+        """
+        pipeline_columns = [column for column in LEAD_COLUMNS if column not in DASHBOARD_COLUMNS]
+        placeholders = ", ".join("?" for _ in LEAD_COLUMNS)
+        updates = [f"{column} = excluded.{column}" for column in pipeline_columns]
+        updates += [
+            f"{column} = CASE WHEN excluded.{column} != '' THEN excluded.{column} ELSE leads.{column} END"
+            for column in DASHBOARD_COLUMNS
+        ]
+        sql = f"""
+            INSERT INTO leads ({", ".join(LEAD_COLUMNS)}, updated_at) VALUES ({placeholders}, ?)
+            ON CONFLICT (linkedin_url, company) DO UPDATE SET {", ".join(updates)}, updated_at = excluded.updated_at
+        """
+        count = 0
+        #Commit in chunks so a long streaming run doesn't hold the write lock the dashboard needs
+        for chunk in chunked(rows, UPSERT_CHUNK_SIZE):
+            with self.connect() as conn:
+                conn.executemany(sql, [[row.get(column) or "" for column in LEAD_COLUMNS] + [time.time()] for row in chunk])
+                self._bump_version(conn)
+            count += len(chunk)
+        return count
+
+    def import_csv(self, filename):
+        with open(filename, newline="") as csvfile:
+            return self.upsert_leads(csv.DictReader(csvfile))
+
+    def export_csv(self, filename):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        count = 0
+        with open(filename, mode="w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=LEAD_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            for lead in self.iter_leads():
+                writer.writerow(lead)
+                count += 1
+        return count
+
+    def read_dataframe(self):
+        import pandas as pd
+        with self.connect() as conn:
+            return pd.read_sql_query("SELECT * FROM leads ORDER BY id", conn, index_col="id")
+
+def has_leads(path=STORE_PATH):
+    #Checked without creating the store, since LeadStore(path) makes an empty one
+    return os.path.exists(path) and LeadStore(path).count() > 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import or export the lead store")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("csv_file", nargs="?", default="data/contacts_with_messages.csv")
+    parser.add_argument("--store", default=STORE_PATH)
+    args = parser.parse_args()
+
+    store = LeadStore(args.store)
+    if args.action == "import":
+        count = store.import_csv(args.csv_file)
+        print(f"Imported {count} leads from {args.csv_file} -> {args.store}")
+    else:
+        count = store.export_csv(args.csv_file)
+        print(f"Exported {count} leads from {args.store} -> {args.csv_file}")
@@ -0,0 +1,263 @@
+import os
+import random
+import sys
+import threading
+import time
+from src.llm_cache import LLMCache, make_cache_key
+from src.metrics import get_metrics
+
+DEFAULT_MODEL = "gpt-4"
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    #Built on first use: importing openai and reading .env take most of a second, and many runs never call the API
+    global _client
+    with _client_lock:
+        if _client is None:
+            from dotenv import load_dotenv
+            from openai import OpenAI
+            load_dotenv()
+            #OPENAI_BASE_URL lets us point the pipeline at a local fake server (see src/fake_openai_server.py)
+            #Retries are handled below so the client itself should not retry on its own
+            _client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                max_retries=0
+            )
+        return _client
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+#Set LLM_CACHE_DISABLED=1 to always go to the API
+CACHE_ENABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    #Opened on first use so importing this module doesn't touch the disk
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = LLMCache()
+        return _response_cache
+
+def cache_stats():
+    if _response_cache is None:
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0}
+    return _response_cache.stats()
+
+def estimate_tokens(text):
+    #Rough estimate (~4 characters per token), good enough for rate limiting
+    return len(text) // 4 + 1
+
+class RateLimiter:
+    """
+    Thread safe token bucket limiter for requests per minute and tokens per minute.
+    Either limit can be None to disable it.
+    """
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.requests_per_minute,
+                self._request_allowance + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.tokens_per_minute,
+                self._token_allowance + elapsed * self.tokens_per_minute / 60
+            )
+
+    def acquire(self, tokens=0):
+        if self.tokens_per_minute:
+            #a single request bigger than the whole budget would otherwise wait forever
+            tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                wait = 0.0
+                if self.requests_per_minute and self._request_allowance < 1:
+                    wait = max(wait, (1 - self._request_allowance) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._token_allowance < tokens:
+                    wait = max(wait, (tokens - self._token_allowance) * 60 / self.tokens_per_minute)
+                if wait == 0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    return
+            time.sleep(wait)
+
+def is_retryable(error):
+    #Any error worth checking came from the client, so openai is already imported by now
+    from openai import APIConnectionError, APIStatusError
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    #APIConnectionError also covers timeouts
+    return isinstance(error, APIConnectionError)
+
+def backoff_delay(attempt, error=None, base=1.0, cap=60.0):
+    #Honor Retry-After when the server sends one, otherwise use full jitter exponential backoff
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        try:
+            return min(cap, float(retry_after)) + random.uniform(0, base)
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def to_messages(prompt):
+    #A plain string is sent as one user message; a list is already chat messages (see src/prompts.py)
+    return prompt if isinstance(prompt, list) else [{"role": "user", "content": prompt}]
+
+def messages_text(messages):
+    return "\n".join(message["content"] for message in messages)
+
+def lookup_cache(model, messages, params, use_cache, refresh_cache):
+    #Returns (cache or None, key, cached reply or None)
+    if not (use_cache and CACHE_ENABLED):
+        return None, None, None
+    cache = get_response_cache()
+    cache_key = make_cache_key(model, messages, params)
+    return cache, cache_key, None if refresh_cache else cache.get(cache_key)
+
+def record_usage(purpose, model, started, retries, prompt, content, usage=None):
+    #Token counts come from the API when it reports them, otherwise they are estimated
+    details = getattr(usage, "prompt_tokens_details", None)
+    get_metrics().record_call(
+        purpose, model,
+        latency=time.perf_counter() - started,
+        prompt_tokens=usage.prompt_tokens if usage else estimate_tokens(prompt),
+        completion_tokens=usage.completion_tokens if usage else estimate_tokens(content),
+        cached_prompt_tokens=(getattr(details, "cached_tokens", None) or 0) if details else 0,
+        retries=retries
+    )
+
+def chat_completion(prompt, model=DEFAULT_MODEL, rate_limiter=None, max_retries=5, expected_completion_tokens=300,
+                    use_cache=True, refresh_cache=False, purpose="chat", **params):
+    """
+    Sends a prompt (a string, or a list of chat messages) and returns the reply text.
+    Identical requests are served from the on-disk cache unless use_cache is False;
+    refresh_cache skips the lookup but still stores the new response.
+    purpose labels the call in the run metrics (see src/metrics.py).
+    """
+    messages = to_messages(prompt)
+    prompt = messages_text(messages)
+
+    cache, cache_key, cached = lookup_cache(model, messages, params, use_cache, refresh_cache)
+    if cached is not None:
+        get_metrics().record_call(purpose, model, cached=True)
+        return cached
+
+    attempt = 0
+    started = time.perf_counter()
+    while True:
+        if rate_limiter:
+            rate_limiter.acquire(estimate_tokens(prompt) + params.get("max_tokens", expected_completion_tokens))
+        try:
+            response = get_client().chat.completions.create(model=model, messages=messages, **params)
+            content = response.choices[0].message.content.strip()
+            record_usage(purpose, model, started, attempt, prompt, content, response.usage)
+            if cache is not None:
+                cache.set(cache_key, content, model)
+            return content
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                get_metrics().record_call(purpose, model, latency=time.perf_counter() - started, retries=attempt, error=True)
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"Retrying after {type(e).__name__} (attempt {attempt + 1}/{max_retries}) in {delay:.1f}s...")
+            time.sleep(delay)
+            attempt += 1
+
+def stream_chat_completion(prompt, model=DEFAULT_MODEL, rate_limiter=None, max_retries=5, expected_completion_tokens=300,
+                           use_cache=True, refresh_cache=False, cancel=None, purpose="chat", **params):
+    """
+    Same request as chat_completion, but yields the reply in pieces as they arrive.
+    A cached reply comes back as one piece. Failures are only retried before the first piece,
+    after that they are raised. Setting the cancel event (or closing the generator) stops the
+    stream and closes the connection; only a reply that finished streaming is cached.
+    """
+    messages = to_messages(prompt)
+    prompt = messages_text(messages)
+
+    cache, cache_key, cached = lookup_cache(model, messages, params, use_cache, refresh_cache)
+    if cached is not None:
+        get_metrics().record_call(purpose, model, cached=True)
+        yield cached
+        return
+
+    attempt = 0
+    started = time.perf_counter()
+    while True:
+        if rate_limiter:
+            rate_limiter.acquire(estimate_tokens(prompt) + params.get("max_tokens", expected_completion_tokens))
+        try:
+            #include_usage adds a last chunk with the real token counts (and no choices)
+            stream = get_client().chat.completions.create(model=model, messages=messages, stream=True,
+                                                          stream_options={"include_usage": True}, **params)
+            break
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                get_metrics().record_call(purpose, model, latency=time.perf_counter() - started, retries=attempt, error=True)
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"Retrying after {type(e).__name__} (attempt {attempt + 1}/{max_retries}) in {delay:.1f}s...")
+            time.sleep(delay)
+            attempt += 1
+
+    pieces = []
+    usage = None
+    completed = False
+    try:
+        for chunk in stream:
+            if cancel is not None and cancel.is_set():
+                return
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content
+            if not piece:
+                continue
+            if not pieces:
+                #match chat_completion, which strips the reply
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+            pieces.append(piece)
+            yield piece
+        completed = True
+    finally:
+        stream.close()
+        #cancelled streams are still paid for, up to the point they were closed
+        record_usage(purpose, model, started, attempt, prompt, "".join(pieces), usage)
+        if not completed:
+            get_metrics().increment("streams_interrupted")
+
+    if cache is not None:
+        cache.set(cache_key, "".join(pieces).strip(), model)
+
+def echo_stream(pieces, out=None):
+    #Prints a streamed reply as it arrives and returns the full text
+    out = out or sys.stdout
+    text = []
+    for piece in pieces:
+        text.append(piece)
+        out.write(piece)
+        out.flush()
+    out.write("\n")
+    return "".join(text).strip()
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_PATH = "data/pipeline_manifest.json"
+
+def fingerprint_value(value):
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def fingerprint_file(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class StageManifest:
+    """
+    Remembers a fingerprint of each stage's inputs so main.py can skip stages whose inputs haven't changed.
+    """
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.stages = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.stages = json.load(f)
+
+    def is_fresh(self, stage, fingerprint, outputs):
+        entry = self.stages.get(stage)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        #outputs are only checked for existence, since the dashboard edits the final CSV in place
+        return all(os.path.exists(output) for output in outputs)
+
+    def record(self, stage, fingerprint):
+        self.stages[stage] = {"fingerprint": fingerprint}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.stages, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class RowCheckpoint:
+    """
+    Append-only JSONL log of finished rows, keyed by a fingerprint of each row's inputs.
+    Lets an interrupted run pick up where it stopped, and later runs reuse results for unchanged rows.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        self.hits = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        #the last line can be cut short if the process was killed mid-write
+                        continue
+                    self.results[entry["key"]] = entry["value"]
+
+    def get(self, key):
+        value = self.results.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def add(self, key, value):
+        with self._lock:
+            self.results[key] = value
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": key, "value": value}) + "\n")
+                f.flush()
+
+    def compact(self, keys):
+        #Rewrite the log with one line per key still in use, dropping stale and duplicate entries
+        with self._lock:
+            self.results = {key: value for key, value in self.results.items() if key in keys}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                for key, value in self.results.items():
+                    f.write(json.dumps({"key": key, "value": value}) + "\n")
+            os.replace(tmp_path, self.path)
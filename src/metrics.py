@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.getenv("METRICS_DIR", "data/metrics")
+
+#USD per 1k tokens (prompt, completion); unknown models are reported with zero cost
+#Prompt tokens served from the provider's prefix cache are billed at CACHED_PROMPT_DISCOUNT of the prompt price
+MODEL_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015)
+}
+
+CACHED_PROMPT_DISCOUNT = 0.5
+
+#Upper bounds in seconds, Prometheus style
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens=0):
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    billed_prompt = prompt_tokens - cached_prompt_tokens + cached_prompt_tokens * CACHED_PROMPT_DISCOUNT
+    return billed_prompt / 1000 * prompt_price + completion_tokens / 1000 * completion_price
+
+class CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        #prompt tokens the provider served from its prefix cache (already included in prompt_tokens)
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latency_sum = 0.0
+        #one count per bucket plus +Inf, not cumulative until exported
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def to_dict(self):
+        timed = self.calls - self.cache_hits
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "prompt_tokens_per_request": round(self.prompt_tokens / timed, 1) if timed else None,
+            "completion_tokens": self.completion_tokens,
+            "estimated_cost_usd": round(self.cost, 4),
+            "latency_avg_seconds": round(self.latency_sum / timed, 3) if timed else None,
+            "latency_histogram": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], self.latency_buckets))
+        }
+
+class Metrics:
+    """
+    In-process counters for one run: wall time per stage, and per OpenAI call latency, retries,
+    tokens and estimated cost, grouped by (purpose, model). Thread safe, since calls come from worker pools.
+    """
+    def __init__(self, job="pipeline"):
+        self.job = job
+        self.started_at = time.time()
+        self.stages = {}
+        self.counters = defaultdict(int)
+        self.calls = defaultdict(CallStats)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def record_call(self, purpose, model, latency=0.0, prompt_tokens=0, completion_tokens=0, retries=0,
+                    cached=False, error=False, cached_prompt_tokens=0):
+        with self._lock:
+            stats = self.calls[(purpose, model)]
+            stats.calls += 1
+            stats.retries += retries
+            stats.errors += int(error)
+            if cached:
+                #served from the response cache: no latency and nothing spent
+                stats.cache_hits += 1
+                return
+            stats.prompt_tokens += prompt_tokens
+            stats.cached_prompt_tokens += cached_prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += estimate_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens)
+            stats.latency_sum += latency
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+            stats.latency_buckets[bucket] += 1
+
+    def report(self):
+        with self._lock:
+            calls = [
+                {"purpose": purpose, "model": model, **stats.to_dict()}
+                for (purpose, model), stats in sorted(self.calls.items())
+            ]
+            return {
+                "job": self.job,
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+                "wall_seconds": round(time.time() - self.started_at, 3),
+                "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                "counters": dict(self.counters),
+                "openai_calls": calls,
+                "totals": {
+                    "calls": sum(call["calls"] for call in calls),
+                    "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+                    "cached_prompt_tokens": sum(call["cached_prompt_tokens"] for call in calls),
+                    "completion_tokens": sum(call["completion_tokens"] for call in calls),
+                    "estimated_cost_usd": round(sum(call["estimated_cost_usd"] for call in calls), 4)
+                }
+            }
+
+    def prometheus(self):
+        #Text exposition format, for node_exporter's textfile collector
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP leadgen_{name} {help_text}")
+            lines.append(f"# TYPE leadgen_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{value}"' for key, value in {"job": self.job, **labels}.items())
+                lines.append(f"leadgen_{name}{{{label_text}}} {value}")
+
+        with self._lock:
+            metric("stage_seconds", "gauge", "Wall time spent in each stage of the last run.",
+                   [({"stage": name}, round(seconds, 3)) for name, seconds in self.stages.items()])
+            metric("events_total", "counter", "Run level counters.",
+                   [({"event": name}, value) for name, value in self.counters.items()])
+
+            items = sorted(self.calls.items())
+            for name, attribute, help_text in [
+                ("openai_calls_total", "calls", "OpenAI calls, cache hits included."),
+                ("openai_errors_total", "errors", "OpenAI calls that failed after retries."),
+                ("openai_cache_hits_total", "cache_hits", "Calls served from the response cache."),
+                ("openai_retries_total", "retries", "Retried OpenAI requests."),
+                ("openai_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent."),
+                ("openai_cached_prompt_tokens_total", "cached_prompt_tokens", "Prompt tokens served from the provider's prefix cache."),
+                ("openai_completion_tokens_total", "completion_tokens", "Completion tokens received."),
+                ("openai_cost_usd_total", "cost", "Estimated spend in USD.")
+            ]:
+                metric(name, "counter", help_text,
+                       [({"purpose": purpose, "model": model}, round(getattr(stats, attribute), 6)) for (purpose, model), stats in items])
+
+            lines.append("# HELP leadgen_openai_latency_seconds OpenAI request latency, retries included.")
+            lines.append("# TYPE leadgen_openai_latency_seconds histogram")
+            for (purpose, model), stats in items:
+                labels = f'job="{self.job}",purpose="{purpose}",model="{model}"'
+                cumulative = 0
+                for bound, count in zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], stats.latency_buckets):
+                    cumulative += count
+                    lines.append(f'leadgen_openai_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"leadgen_openai_latency_seconds_sum{{{labels}}} {round(stats.latency_sum, 6)}")
+                lines.append(f"leadgen_openai_latency_seconds_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory=METRICS_DIR):
+        """
+        Writes <job>_report.json and <job>.prom; returns their paths.
+        Each file is written to a temp name and renamed, so a scraper never sees half a file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for filename, content in [
+            (f"{self.job}_report.json", json.dumps(self.report(), indent=2)),
+            (f"{self.job}.prom", self.prometheus())
+        ]:
+            path = os.path.join(directory, filename)
+            with open(path + ".tmp", "w") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+            paths.append(path)
+        return paths
+
+_metrics = Metrics()
+
+def get_metrics():
+    return _metrics
+
+def set_job(job):
+    #The dashboard and the pipeline share the LLM helpers but report separately
+    _metrics.job = job
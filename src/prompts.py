@@ -0,0 +1,144 @@
+"""
+Prompt templates for outreach and follow-up messages.
+
+Every prompt is laid out from most shared to least shared: the static instructions (one short
+system message per channel), then the company block, then the contact. Contacts arrive grouped
+by company and batches by channel, so consecutive requests share a prefix. OpenAI only caches
+prefixes past 1024 tokens, which single contact prompts don't reach, so the saving there is the
+smaller prompt itself. To compare against the old prompts on a real contact list:
+
+    python -m src.prompts data/contacts_with_emails.csv
+"""
+
+import argparse
+import os
+from src.llm import estimate_tokens, messages_text
+from src.manifest import fingerprint_value
+from src.streaming import iter_csv
+
+#Kept short on purpose: these prompts are far below the 1024 tokens a provider prefix cache needs,
+#so every system token is paid in full on every request
+OUTREACH_SYSTEMS = {
+    "email": '''Write short, very personalized cold outreach emails for a solution built on DuPont Tedlar, high durability protective films for signage, vehicle wraps and commercial graphics. Make each relevant to the person's role and industry, and end by encouraging them to connect, e.g. "Would love to connect if this is relevant to your team."''',
+    "linkedin": """Write short, casual LinkedIn messages about high performance protective films for signage and commercial graphics, built with DuPont Tedlar. Keep them conversational and light, like an actual direct message, with a low pressure encouragement to connect."""
+}
+
+FOLLOWUP_SYSTEM = """You write follow up messages for B2B outreach about DuPont Tedlar protective films for signage.
+Assume you previously reached out to the person and haven't heard back.
+Make sure the follow up is short, professional, polite and friendly, and include a soft invitation to connect."""
+
+ASKS = {
+    "email": "Write the email to {name}.",
+    "linkedin": "Write the LinkedIn message to {name}."
+}
+
+BATCH_CHANNELS = {"email": "an email", "linkedin": "a LinkedIn message"}
+BATCH_ASK = """Write {channel} to each contact above. Respond with only a JSON array, one object per contact, in the form
+[{{"id": <contact id>, "message": "<message text>"}}]"""
+
+#Part of every saved message's fingerprint, so messages written with older prompts are regenerated.
+#Template text changes are picked up on their own; bump the number when a builder below changes layout
+PROMPT_VERSION = fingerprint_value([1, OUTREACH_SYSTEMS, ASKS, BATCH_CHANNELS, BATCH_ASK])[:12]
+
+def outreach_channel(outreach_method):
+    return "email" if outreach_method == "email" else "linkedin"
+
+def company_block(company, event=None, rationale=None):
+    lines = [f"Company: {company}"]
+    if event:
+        lines.append(f"Attending: {event}")
+    if rationale:
+        lines.append(f"Selected because: {rationale}")
+    return "\n".join(lines)
+
+def contact_block(name, title):
+    return f"Contact: {name}, {title}"
+
+def outreach_messages(name, title, company, outreach_method, event=None, rationale=None):
+    channel = outreach_channel(outreach_method)
+    return [
+        {"role": "system", "content": OUTREACH_SYSTEMS[channel]},
+        {"role": "user", "content": f"{company_block(company, event, rationale)}\n\n{contact_block(name, title)}\n{ASKS[channel].format(name=name)}"}
+    ]
+
+def batch_outreach_messages(batch, outreach_method):
+    """
+    One request for a list of (contact id, row) pairs. Each company block is written once,
+    followed by its contacts as "- id <n>: ..." lines.
+    """
+    channel = outreach_channel(outreach_method)
+    sections, current = [], None
+    for contact_id, row in batch:
+        company = (row["company"], row.get("event", ""), row.get("rationale", ""))
+        if company != current:
+            sections.append(f"\n{company_block(*company)}")
+            current = company
+        sections.append(f"- id {contact_id}: {row['name']}, {row['title']}")
+    contacts = "\n".join(sections).strip()
+    return [
+        {"role": "system", "content": OUTREACH_SYSTEMS[channel]},
+        {"role": "user", "content": f"{contacts}\n\n{BATCH_ASK.format(channel=BATCH_CHANNELS[channel])}"}
+    ]
+
+def followup_messages(name, title, company):
+    return [
+        {"role": "system", "content": FOLLOWUP_SYSTEM},
+        {"role": "user", "content": f"{company_block(company)}\n\n{contact_block(name, title)}\nWrite the follow up message to {name}."}
+    ]
+
+def legacy_outreach_prompt(row):
+    #The single user prompt used before these templates, contact first; kept only for comparison
+    name, title, company = row["name"], row["title"], row["company"]
+    base_intro = f"{name} is the {title} at {company}."
+    if row.get("event"):
+        base_intro += f" They are attending {row['event']}."
+    if row.get("rationale"):
+        base_intro += f" {company} was selected because \"{row['rationale']}\"."
+    if row["outreach_method"] == "email":
+        return f"""
+        Write a short but very personalized cold outreach email to {name}, the {title} at {company}.
+        {base_intro}
+        You are introduing a solution/product built on DuPont Tedlar, high durability protective films for signage, vehicle wraps and commercial graphics. 
+        Make it relevant to their role and industry, and end with something encouraging them to connect such as "Would love to connect if this is relevant to your team." or something similar.
+        """
+    return f"""
+        Write a short, casual LinkedIn message to {name}, the {title} at {company}.
+        {base_intro}
+        Mention that you are reaching out about high performance protective films for signage, a commercial graphics, built with DuPont Tedlar. 
+        Make the message conversational and light, like an actual direct message, with a low pressure encouragement to connect. 
+        """
+
+def prefix_stats(prompts):
+    """
+    Average tokens per request, and how many of them repeat the previous request's prefix,
+    i.e. the part a provider side prefix cache could reuse when requests are sent in this order.
+    """
+    total = shared = 0
+    previous = ""
+    for prompt in prompts:
+        total += estimate_tokens(prompt)
+        shared += estimate_tokens(os.path.commonprefix([previous, prompt]))
+        previous = prompt
+    count = max(len(prompts), 1)
+    return total / count, shared / count
+
+def compare(path):
+    rows = list(iter_csv(path))
+    if not rows:
+        raise SystemExit(f"No contacts found in {path}")
+    layouts = {
+        "contact first (before)": [legacy_outreach_prompt(row) for row in rows],
+        "shared prefix (now)": [messages_text(outreach_messages(row["name"], row["title"], row["company"], row["outreach_method"],
+                                                          row.get("event"), row.get("rationale"))) for row in rows]
+    }
+    print(f"{len(rows)} requests from {path}")
+    for label, prompts in layouts.items():
+        per_request, shared = prefix_stats(prompts)
+        print(f"  {label:<24} {per_request:7.1f} prompt tokens/request, {shared:7.1f} shared with the previous request "
+              f"({shared / per_request:.0%}), {per_request - shared:7.1f} new")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare prompt tokens per request and shared prefixes for a contact list")
+    parser.add_argument("path", nargs="?", default="data/contacts_with_emails.csv")
+    args = parser.parse_args()
+    compare(args.path)
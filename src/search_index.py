@@ -0,0 +1,115 @@
+import numpy as np
+
+SEARCH_COLUMNS = ["name", "title", "company"]
+
+def trigram_codes(chars):
+    #chars is an array of code points; anything non-ASCII shares one bucket,
+    #which can only add false candidates, and those are dropped by the substring check
+    chars = np.minimum(chars, 127).astype(np.int64)
+    return chars[..., :-2] * 16384 + chars[..., 1:-1] * 128 + chars[..., 2:]
+
+def sorted_unique(values):
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+class LeadSearchIndex:
+    """
+    In-memory search over name, title and company, built once per loaded lead frame.
+    Queries are plain text (never regex), case insensitive, and every word in the query must match.
+    Words of 3+ characters match anywhere (substring); shorter words match the start of a word (prefix).
+    """
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        self.labels = df.index.to_numpy()
+        #Every field starts with a space so word prefixes become ordinary substrings (" re"),
+        #and fields are tab separated (the last one too) so a query can't match across two of them
+        #and a short word at the very end still has a trigram (" x\t")
+        combined = " " + df[columns[0]].fillna("").astype(str)
+        for column in columns[1:]:
+            combined = combined + "\t " + df[column].fillna("").astype(str)
+        self.texts = (combined + "\t").str.lower().tolist()
+        self._build_postings()
+
+    def _build_postings(self):
+        n = len(self.texts)
+        if n == 0:
+            self.codes = np.empty(0, dtype=np.int64)
+            self.starts = np.zeros(1, dtype=np.int64)
+            self.docs = np.empty(0, dtype=np.int64)
+            return
+
+        #All texts back to back, NUL separated, so memory follows the total text length
+        #rather than n times the longest text
+        chars = np.frombuffer("\0".join(self.texts).encode("utf-32-le"), dtype=np.uint32)
+        lengths = np.fromiter((len(text) + 1 for text in self.texts), dtype=np.int64, count=n)
+        docs = np.repeat(np.arange(n, dtype=np.int64), lengths)[:len(chars)]
+        codes = trigram_codes(chars)
+        #trigrams that run across the separator between two texts are not real
+        valid = (chars[:-2] != 0) & (chars[1:-1] != 0) & (chars[2:] != 0)
+        docs = docs[:-2]
+
+        #one entry per (trigram, lead), sorted by trigram then lead
+        keys = sorted_unique(codes[valid] * n + docs[valid])
+        self.docs = keys % n
+        key_codes = keys // n
+        first = np.flatnonzero(np.concatenate(([True], key_codes[1:] != key_codes[:-1])))
+        self.codes = key_codes[first]
+        self.starts = np.append(first, len(keys))
+
+    def _postings(self, code):
+        i = np.searchsorted(self.codes, code)
+        if i == len(self.codes) or self.codes[i] != code:
+            return self.docs[:0]
+        return self.docs[self.starts[i]:self.starts[i + 1]]
+
+    def _term_positions(self, term):
+        """
+        Returns (sorted lead positions, exact). exact is False when the positions are only
+        candidates that still need the substring check.
+        """
+        chars = np.array([ord(c) for c in term], dtype=np.uint32)
+        exact = len(term) <= 3 and bool((chars < 127).all())
+        if len(term) == 2:
+            #every trigram starting with these two characters sits in one contiguous block
+            low = int(np.minimum(chars, 127)[0]) * 16384 + int(np.minimum(chars, 127)[1]) * 128
+            i, j = np.searchsorted(self.codes, [low, low + 128])
+            return sorted_unique(self.docs[self.starts[i]:self.starts[j]]), exact
+
+        postings = sorted((self._postings(code) for code in set(trigram_codes(chars).tolist())), key=len)
+        if len(postings[0]) * 16 < len(self.texts):
+            positions = postings[0]
+            for other in postings[1:]:
+                if len(positions) == 0:
+                    break
+                positions = np.intersect1d(positions, other, assume_unique=True)
+            return positions, exact
+
+        #every posting is large, so counting hits per lead beats repeated sorted intersections
+        hits = np.zeros(len(self.texts), dtype=np.int32)
+        for positions in postings:
+            hits[positions] += 1
+        return np.flatnonzero(hits == len(postings)), exact
+
+    def search(self, query):
+        """
+        Returns the index labels of matching leads, in their original order.
+        """
+        #short words are treated as word prefixes
+        terms = [word if len(word) >= 3 else " " + word for word in query.lower().split()]
+        if not terms:
+            return self.labels
+
+        #narrow down with the index first, so the substring check only runs on the final candidates
+        result = None
+        unverified = []
+        for term in terms:
+            positions, exact = self._term_positions(term)
+            result = positions if result is None else np.intersect1d(result, positions, assume_unique=True)
+            if not exact:
+                unverified.append(term)
+            if len(result) == 0:
+                return self.labels[result]
+
+        texts = self.texts
+        for term in unverified:
+            result = result[np.fromiter((term in texts[i] for i in result), dtype=bool, count=len(result))]
+        return self.labels[result]
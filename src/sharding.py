@@ -0,0 +1,137 @@
+import argparse
+import hashlib
+import heapq
+import os
+from src.company_index import normalize_company
+from src.streaming import iter_csv, write_csv
+
+#Each contact's position in the full (unsharded) contact list, so merged output keeps the original order
+POSITION_COLUMN = "shard_position"
+DUPLICATE_KEY = ("linkedin_url", "company")
+MERGED_FILE = "data/contacts_with_messages.csv"
+
+def parse_shard(spec):
+    """
+    "2/4" -> (2, 4). Shards are numbered from 0, so a 4-way split is 0/4 through 3/4.
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must look like i/N, got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard index must be between 0 and {count - 1}, got {spec!r}")
+    return index, count
+
+def shard_of(company, count):
+    #Hash of the normalized name, so every contact of a company (however it's spelled) lands on one shard,
+    #and the assignment is the same on every machine and every run
+    digest = hashlib.sha1(normalize_company(company).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+def shard_rows(rows, shard):
+    """
+    Numbers every row, then keeps the ones that belong to this shard.
+    Every shard sees the full list, which is what makes the positions global.
+    """
+    index, count = shard
+    for position, row in enumerate(rows):
+        if shard_of(row["company"], count) == index:
+            row[POSITION_COLUMN] = position
+            yield row
+
+def shard_path(path, shard):
+    #data/contacts.csv -> data/contacts.shard-0-of-4.csv
+    if shard is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+def merge_shards(paths, output_file, key_fields=DUPLICATE_KEY):
+    """
+    Merges shard outputs into one CSV in the original row order.
+    Each shard file is already in position order, so this is a streaming k-way merge.
+    Rows whose key was already written are dropped; returns (rows written, duplicates dropped, conflicts),
+    where a conflict is a duplicate whose other columns differ from the row that was kept.
+    """
+    def keyed(path):
+        for row in iter_csv(path):
+            yield int(row[POSITION_COLUMN]), row
+
+    kept = {}
+    stats = {"duplicates": 0, "conflicts": 0}
+
+    def unique_rows():
+        for _, row in heapq.merge(*(keyed(path) for path in paths), key=lambda item: item[0]):
+            del row[POSITION_COLUMN]
+            key = tuple(row.get(field, "") for field in key_fields)
+            fingerprint = hash(tuple(sorted(row.items())))
+            if key in kept:
+                stats["duplicates"] += 1
+                if kept[key] != fingerprint:
+                    stats["conflicts"] += 1
+                    print(f"⚠️ Conflicting duplicate for {' / '.join(key)}, keeping the first one")
+                continue
+            kept[key] = fingerprint
+            yield row
+
+    count = write_csv(unique_rows(), output_file)
+    return count, stats["duplicates"], stats["conflicts"]
+
+def find_shard_files(path):
+    #Every shard output next to path, e.g. data/contacts_with_messages.shard-*-of-*.csv
+    root, ext = os.path.splitext(path)
+    directory = os.path.dirname(path) or "."
+    prefix = os.path.basename(root) + ".shard-"
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith(prefix) and name.endswith(ext)
+    )
+
+def check_complete(paths):
+    #All files should come from the same N, and every shard 0..N-1 should be there
+    specs = set()
+    for path in paths:
+        spec = os.path.splitext(path)[0].rsplit(".shard-", 1)[-1]
+        index, _, count = spec.partition("-of-")
+        if not (index.isdigit() and count.isdigit()):
+            raise ValueError(f"{path} doesn't look like a shard output (<name>.shard-<i>-of-<N>.csv)")
+        specs.add((int(index), int(count)))
+    counts = {count for _, count in specs}
+    if len(counts) != 1:
+        raise ValueError(f"Shard files come from different splits: {sorted(counts)}")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - {index for index, _ in specs})
+    if missing:
+        raise ValueError(f"Missing shard outputs for shard(s) {', '.join(map(str, missing))} of {count}")
+
+def merge_command(files=None, output_file=MERGED_FILE, store_path=None, allow_partial=False):
+    """
+    Merges the given shard files (default: every shard next to MERGED_FILE) and optionally loads the store.
+    Raises ValueError when there is nothing to merge or a shard is missing.
+    """
+    files = files or find_shard_files(MERGED_FILE)
+    if not files:
+        raise ValueError(f"No shard files found next to {MERGED_FILE}")
+    if not allow_partial:
+        check_complete(files)
+
+    count, duplicates, conflicts = merge_shards(files, output_file)
+    print(f"Merged {len(files)} shard files into {count} rows -> {output_file} ({duplicates} duplicates dropped, {conflicts} conflicting)")
+    if store_path:
+        from src.lead_store import LeadStore
+        print(f"Loaded {LeadStore(store_path).import_csv(output_file)} leads -> {store_path}")
+
+def add_merge_arguments(parser):
+    parser.add_argument("files", nargs="*", help="Shard CSVs (default: every data/contacts_with_messages.shard-*.csv)")
+    parser.add_argument("--output", default=MERGED_FILE)
+    parser.add_argument("--store", default=None, help="Also load the merged leads into this SQLite store")
+    parser.add_argument("--allow-partial", action="store_true", help="Merge even if some shards are missing")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the outputs of sharded pipeline runs")
+    add_merge_arguments(parser)
+    args = parser.parse_args()
+    try:
+        merge_command(args.files, args.output, args.store, args.allow_partial)
+    except ValueError as e:
+        parser.error(str(e))
@@ -0,0 +1,88 @@
+import csv
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def iter_csv(filename):
+    with open(filename, newline="") as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield row
+
+class CSVRowWriter:
+    """
+    Writes dict rows one at a time, taking the header from the first row.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, row):
+        if self._writer is None:
+            directory = os.path.dirname(self.filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.filename, mode="w", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row.keys()))
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_csv(rows, filename):
+    with CSVRowWriter(filename) as writer:
+        for row in rows:
+            writer.write(row)
+    if not writer.count:
+        #still leave a file behind, so an empty result (like an empty shard) reads as done rather than missing
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        open(filename, "w").close()
+    return writer.count
+
+def tee_to_csv(rows, filename):
+    #Passes rows through unchanged while also saving them, for optional intermediate CSVs
+    with CSVRowWriter(filename) as writer:
+        for row in rows:
+            writer.write(row)
+            yield row
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def map_in_order(worker, tasks, concurrency=1):
+    """
+    Like executor.map, but pulls tasks lazily and keeps at most 2 * concurrency in flight,
+    so it works on unbounded generators without reading them into memory.
+    """
+    if concurrency <= 1:
+        for task in tasks:
+            yield worker(task)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(executor.submit(worker, task))
+            if len(in_flight) >= concurrency * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,63 @@
+"""
+Import time regression check: the CLI and the pipeline modules must start without pulling in
+the heavy dependencies, so cron driven partial runs (python main.py events, contacts, ...) stay fast.
+
+    python src/test_import_time.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Only imported (or constructed) once something actually needs them
+HEAVY_MODULES = ["openai", "dotenv", "pandas", "numpy", "altair", "pyperclip", "streamlit", "httpx", "bs4"]
+LIGHT_IMPORTS = ["main", "src.generate_outreach", "src.llm", "src.find_contacts", "src.infer_email", "src.followups", "src.sharding", "src.followup_scheduler", "src.ingest_events"]
+
+#Whole process, interpreter start up included
+STARTUP_BUDGET_SECONDS = 0.5
+
+def heavy_modules_after(statement):
+    code = f"import sys; {statement}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return [module for module in output.strip().split(",") if module]
+
+def test_no_heavy_imports():
+    for module in LIGHT_IMPORTS:
+        loaded = heavy_modules_after(f"import {module}")
+        assert not loaded, f"importing {module} also imports {', '.join(loaded)}"
+
+def test_no_client_at_import():
+    loaded = heavy_modules_after("import src.llm as llm; assert llm._client is None")
+    assert not loaded, f"src.llm imports {', '.join(loaded)}"
+
+def timed_run(*args, cwd):
+    #Best of three, so one slow start on a busy machine doesn't fail the check
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), *args], cwd=cwd, capture_output=True, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def test_partial_run_startup():
+    with tempfile.TemporaryDirectory() as workdir:
+        for stage in ["events", "contacts"]:
+            elapsed = timed_run(stage, "--force", cwd=workdir)
+            print(f"  main.py {stage}: {elapsed:.3f}s")
+            assert elapsed < STARTUP_BUDGET_SECONDS, f"main.py {stage} took {elapsed:.2f}s (budget {STARTUP_BUDGET_SECONDS}s)"
+
+if __name__ == "__main__":
+    failures = 0
+    for check in [test_no_heavy_imports, test_no_client_at_import, test_partial_run_startup]:
+        try:
+            check()
+            print(f"✅ {check.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {check.__name__}: {e}")
+    sys.exit(1 if failures else 0)